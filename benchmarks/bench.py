@@ -0,0 +1,379 @@
+# Times the sorter's hot paths against a generated gala inbox.
+#
+#   python benchmarks/bench.py --out baseline.json
+#   python benchmarks/bench.py --baseline baseline.json   (exit 1 on regressions)
+#
+# The inbox (lavfi test clips with rotation/creation_time tags, JPEGs with
+# and without EXIF, a few oversized clips) is generated once from a fixed
+# seed and reused; every benchmark works on fresh copies of it.
+import argparse, contextlib, io, json, os, platform, random, shutil, subprocess, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import file_sorter as fs  # noqa: E402
+
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "file_sorter_bench")
+SEED = 20250503
+CLIP_SHAPES = [(1280, 720), (720, 1280), (1920, 1080)]
+ROTATIONS = [0, 0, 90, 180, 270]
+CONTAINERS = [".mp4", ".mp4", ".mov", ".mkv"]
+BASE_TIME = 1746262800  # 2025-05-03 09:00 UTC
+
+
+def _ffmpeg(*args):
+    subprocess.run([fs.ffmpeg_exe, "-v", "error", "-y", "-nostdin", *args], check=True)
+
+
+def make_clip(path, w, h, seconds, rotation, created):
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created))
+    raw = path + ".raw.mp4"
+    _ffmpeg(
+        "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate=30", "-t", str(seconds),
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", raw,
+    )
+    # Rotation is a display-matrix tag, set on a stream copy like a phone does
+    rot = ["-display_rotation", str(rotation)] if rotation else []
+    _ffmpeg(*rot, "-i", raw, "-c", "copy", "-metadata", f"creation_time={stamp}", path)
+    os.remove(raw)
+    os.utime(path, (created, created))
+
+
+def make_photo(path, created, exif):
+    from PIL import Image
+
+    img = Image.effect_noise((3000, 2000), 40).convert("RGB")
+    kwargs = {}
+    if exif:
+        e = Image.Exif()
+        e.get_ifd(0x8769)[36867] = time.strftime("%Y:%m:%d %H:%M:%S", time.gmtime(created))
+        kwargs["exif"] = e
+    img.save(path, quality=90, **kwargs)
+    os.utime(path, (created, created))
+
+
+def pad_clip(path, target_bytes, rnd):
+    # A trailing 'free' box keeps the file a valid MP4 at any size
+    pad = max(0, target_bytes - os.path.getsize(path) - 16)
+    block = rnd.getrandbits(8 * 8 * 1024 * 1024).to_bytes(8 * 1024 * 1024, "little")
+    with open(path, "ab") as fh:
+        fh.write((1).to_bytes(4, "big") + b"free" + (pad + 16).to_bytes(8, "big"))
+        while pad > 0:
+            n = min(pad, len(block))
+            fh.write(block[:n])
+            pad -= n
+
+
+def generate_inbox(src, clips, photos, big, big_mb):
+    params = {"seed": SEED, "clips": clips, "photos": photos, "big": big, "big_mb": big_mb}
+    stamp = os.path.join(src, "params.json")
+    if os.path.exists(stamp) and json.load(open(stamp)) == params:
+        return params
+    print(f"[INFO] Generating synthetic inbox in {src}")
+    shutil.rmtree(src, ignore_errors=True)
+    os.makedirs(os.path.join(src, "DCIM", "100MEDIA"))
+    rnd = random.Random(SEED)
+    for i in range(clips + big):
+        w, h = rnd.choice(CLIP_SHAPES)
+        ext = ".mp4" if i >= clips else rnd.choice(CONTAINERS)
+        rotation = 0 if ext == ".mkv" else rnd.choice(ROTATIONS)
+        path = os.path.join(src, "DCIM", "100MEDIA", f"C{i:04d}{ext}")
+        make_clip(path, w, h, rnd.choice([2, 3, 4]), rotation, BASE_TIME + i * 600)
+        if i >= clips:
+            pad_clip(path, big_mb * 1024 * 1024, rnd)
+    for i in range(photos):
+        path = os.path.join(src, f"IMG_{i:04d}.jpg")
+        make_photo(path, BASE_TIME + i * 300, exif=i % 2 == 0)
+    with open(stamp, "w") as fh:
+        json.dump(params, fh)
+    return params
+
+
+def isolate(work):
+    # Point every path the module writes to into the work dir
+    lib = os.path.join(work, "library")
+    shutil.rmtree(lib, ignore_errors=True)
+    os.makedirs(lib)
+    fs.DRIVE_ROOT = lib
+    fs.VIDEO_BASE_DIR = os.path.join(lib, "Videos", "Locomotives")
+    fs.PHOTO_BASE_DIR = os.path.join(lib, "Photography", "Locomotives")
+    fs.QUARANTINE_DIR = os.path.join(lib, "Quarantine")
+    for name, leaf in [
+        ("DATA_FILE", "data.json"),
+        ("DB_FILE", "sorter.db"),
+        ("PROBE_CACHE_FILE", "probe_cache.json"),
+        ("MOVE_LOG_FILE", "moves.jsonl"),
+        ("THUMB_CACHE_DIR", "thumbs"),
+    ]:
+        setattr(fs, name, os.path.join(lib, leaf))
+
+
+def reset_probe_cache():
+    fs.probe_cache = {}
+
+
+def reset_thumbs(clear_disk):
+    if clear_disk:
+        shutil.rmtree(fs.THUMB_CACHE_DIR, ignore_errors=True)
+    fs.thumb_cache = fs.ThumbnailCache(fs.THUMB_CACHE_DIR, fs.THUMB_MEMORY_ITEMS, fs.THUMB_DISK_BYTES)
+
+
+def copy_inbox(src, dst):
+    shutil.rmtree(dst, ignore_errors=True)
+    shutil.copytree(src, dst, ignore=shutil.ignore_patterns("params.json"))
+    return fs.list_inbox(dst)
+
+
+def plan_dirs(files):
+    out = []
+    for f in files:
+        rd = fs.get_recorded_date(f)
+        ext = os.path.splitext(f)[1].lower()
+        is_photo = ext in fs.IMAGE_EXTENSIONS
+        orientation = None if is_photo else fs.probe_video_orientation(f)
+        out.append(
+            (f, fs.build_dest_path("Bahamas", "45596", "SVR Gala", *rd[:3], orientation, is_photo), rd[0])
+        )
+    return out
+
+
+def run_moves(planned):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for f, dest_dir, year in planned:
+            fs.move_and_rename(f, dest_dir, "45596", year, "SVR Gala", "", False)
+
+
+def bench(name, fn, setup=None, repeat=3, items=1, nbytes=0):
+    runs = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        runs.append(time.perf_counter() - start)
+    best = min(runs)
+    rec = {"seconds": best, "runs": runs, "items": items, "per_item_ms": 1000 * best / max(items, 1)}
+    if nbytes:
+        rec["mb_per_s"] = nbytes / 1e6 / best if best else 0
+    extra = f", {rec['mb_per_s']:.0f} MB/s" if nbytes else ""
+    print(f"[BENCH] {name}: {best * 1000:.1f} ms ({rec['per_item_ms']:.2f} ms/item{extra})")
+    return rec
+
+
+def run_all(work, params, repeat, cross_dir):
+    src = os.path.join(work, "source")
+    inbox = os.path.join(work, "inbox")
+    files = copy_inbox(src, inbox)
+    videos = [f for f in files if os.path.splitext(f)[1].lower() in fs.VIDEO_EXTENSIONS]
+    results = {}
+
+    def dates():
+        for f in files:
+            fs.get_recorded_date(f)
+
+    def orientations():
+        for f in videos:
+            fs.probe_video_orientation(f)
+
+    def previews():
+        for f in files:
+            fs.get_preview_image(f, 70)
+
+    results["recorded_date_cold"] = bench(
+        "recorded_date_cold", lambda _: dates(), reset_probe_cache, repeat, len(files)
+    )
+    results["recorded_date_warm"] = bench("recorded_date_warm", dates, None, repeat, len(files))
+    results["orientation_cold"] = bench(
+        "orientation_cold", lambda _: orientations(), reset_probe_cache, repeat, len(videos)
+    )
+    results["orientation_warm"] = bench("orientation_warm", orientations, None, repeat, len(videos))
+    results["preview_cold"] = bench(
+        "preview_cold", lambda _: previews(), lambda: reset_thumbs(True), repeat, len(files)
+    )
+    results["preview_disk_cache"] = bench(
+        "preview_disk_cache", lambda _: previews(), lambda: reset_thumbs(False), repeat, len(files)
+    )
+
+    n = 20000
+    results["build_dest_path"] = bench(
+        "build_dest_path",
+        lambda: [
+            fs.build_dest_path("Bahamas", "45596", "SVR Gala", 2025, 5, i % 28 + 1, "Landscape", False)
+            for i in range(n)
+        ],
+        None, repeat, n,
+    )
+
+    crowded = os.path.join(work, "crowded")
+    shutil.rmtree(crowded, ignore_errors=True)
+    os.makedirs(crowded)
+    for i in range(300):
+        open(os.path.join(crowded, fs.dest_file_name("45596", 2025, "SVR Gala", "", ".mp4", i)), "w").close()
+    picks = 1000
+    results["collision_resolve"] = bench(
+        "collision_resolve",
+        lambda index: [
+            index.pick(crowded, "45596", 2025, "SVR Gala", "", ".mp4") for _ in range(picks)
+        ],
+        fs.DestIndex, repeat, picks,
+    )
+
+    total = sum(os.path.getsize(f) for f in files)
+
+    def same_device_setup():
+        isolate(work)
+        return plan_dirs(copy_inbox(src, inbox))
+
+    results["move_same_device"] = bench(
+        "move_same_device", run_moves, same_device_setup, repeat, len(files), total
+    )
+    if cross_dir and fs.device_key(cross_dir) != fs.device_key(work):
+        cross_inbox = os.path.join(cross_dir, "file_sorter_bench_inbox")
+
+        def cross_device_setup():
+            isolate(work)
+            return plan_dirs(copy_inbox(src, cross_inbox))
+
+        results["move_cross_device"] = bench(
+            "move_cross_device", run_moves, cross_device_setup, repeat, len(files), total
+        )
+        shutil.rmtree(cross_inbox, ignore_errors=True)
+        results.update(run_copy_verify(work, src, cross_dir, repeat))
+    else:
+        print("[INFO] No second device for the cross-device move benchmark (see --cross-dir)")
+    return results
+
+
+def run_copy_verify(work, src, cross_dir, repeat):
+    # The biggest clip copied across devices by transfer_file under each
+    # VERIFY_MODE/HASH_ALGORITHM, next to a plain copy + fsync of the same file
+    big = max(fs.list_inbox(src), key=os.path.getsize)
+    nbytes = os.path.getsize(big)
+    stage = os.path.join(cross_dir, "file_sorter_bench_copy")
+    dest = os.path.join(work, "copy_dest" + os.path.splitext(big)[1])
+    results = {}
+
+    def setup():
+        shutil.rmtree(stage, ignore_errors=True)
+        os.makedirs(stage)
+        if os.path.exists(dest):
+            os.remove(dest)
+        return shutil.copy(big, stage)
+
+    def plain(staged):
+        shutil.copyfile(staged, dest)
+        with open(dest, "rb+") as fh:
+            os.fsync(fh.fileno())
+
+    results["copy_plain"] = bench("copy_plain", plain, setup, repeat, 1, nbytes)
+    saved = fs.VERIFY_MODE, fs.HASH_ALGORITHM
+    for mode, algorithm in [
+        ("size", None),
+        ("trust", "blake2b"),
+        ("readback", "blake2b"),
+        ("trust", "xxh3"),
+        ("readback", "xxh3"),
+    ]:
+        if algorithm and fs.new_hasher(algorithm)[0] != algorithm:
+            print(f"[INFO] {algorithm} not available (pip install xxhash), skipped")
+            continue
+        name = f"copy_{mode}" + (f"_{algorithm}" if algorithm else "")
+
+        def verified(staged, mode=mode, algorithm=algorithm):
+            fs.VERIFY_MODE, fs.HASH_ALGORITHM = mode, algorithm or saved[1]
+            with contextlib.redirect_stdout(io.StringIO()):
+                status, msg, _ = fs.transfer_file(staged, dest)
+            if status != "moved":
+                raise RuntimeError(f"{name}: {status}: {msg}")
+
+        try:
+            results[name] = bench(name, verified, setup, repeat, 1, nbytes)
+        finally:
+            fs.VERIFY_MODE, fs.HASH_ALGORITHM = saved
+    shutil.rmtree(stage, ignore_errors=True)
+    return results
+
+
+def tool_version(exe):
+    try:
+        return subprocess.run([exe, "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        return None
+
+
+def git_rev():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(fs.__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold, min_ms):
+    base = json.load(open(baseline_path))["results"]
+    regressions = []
+    for name, rec in results.items():
+        if name not in base:
+            continue
+        old, new = base[name]["seconds"], rec["seconds"]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        # Sub-millisecond timings jitter by more than any threshold
+        if change > threshold and (new - old) * 1000 > min_ms:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"[COMPARE] {name}: {old * 1000:.1f} -> {new * 1000:.1f} ms ({change:+.1f}%){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sorter's hot paths")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where the inbox and library are built")
+    parser.add_argument("--cross-dir", default="/dev/shm" if os.path.isdir("/dev/shm") else None,
+                        help="a folder on another device, for the cross-device move")
+    parser.add_argument("--clips", type=int, default=24)
+    parser.add_argument("--photos", type=int, default=24)
+    parser.add_argument("--big", type=int, default=2, help="number of oversized clips")
+    parser.add_argument("--big-mb", type=int, default=256, help="size of each oversized clip")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best is kept")
+    parser.add_argument("--ffmpeg", default=shutil.which("ffmpeg") or fs.ffmpeg_exe)
+    parser.add_argument("--ffprobe", default=shutil.which("ffprobe") or fs.ffprobe_exe)
+    parser.add_argument("--out", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="compare against an earlier --out file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slower that counts as a regression")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    fs.ffmpeg_exe, fs.ffprobe_exe = args.ffmpeg, args.ffprobe
+    work = os.path.abspath(args.work_dir)
+    os.makedirs(work, exist_ok=True)
+    params = generate_inbox(os.path.join(work, "source"), args.clips, args.photos, args.big, args.big_mb)
+    isolate(work)
+    results = run_all(work, params, args.repeat, args.cross_dir)
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ffmpeg": tool_version(fs.ffmpeg_exe),
+            "inbox": params,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"[INFO] Results written to {args.out}")
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold, args.min_ms)
+        if regressions:
+            print(f"[WARNING] {len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4374 @@
+import bisect, csv, errno, fnmatch, functools, hashlib, importlib, io, math, os, queue, re, select, shutil, json, struct, subprocess, sys, threading, time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+
+# Importing this module must stay cheap and touch nothing on disk: the GUI
+# toolkit, Pillow and the thread pools are loaded on first use, and drive
+# checks / data loading happen in init_environment().
+tk = filedialog = messagebox = ttk = None
+
+
+class _LazyModule:
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+Image = _LazyModule("PIL.Image")
+ImageTk = _LazyModule("PIL.ImageTk")
+ExifTags = _LazyModule("PIL.ExifTags")
+
+
+def _import_tk():
+    global tk, filedialog, messagebox, ttk
+    import tkinter
+    from tkinter import filedialog, messagebox, ttk
+    tk = tkinter
+
+
+def _import_numpy():
+    # Optional: burst grouping falls back to plain Python without it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def ThreadPoolExecutor(*args, **kwargs):
+    # concurrent.futures pulls in logging; only pay for it once a pool is needed
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(*args, **kwargs)
+
+VIDEO_EXTENSIONS = [".mp4", ".mov", ".m4v", ".avi", ".mkv"]
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic"]
+# Containers/stills we can read dates and dimensions from without a subprocess
+MP4_EXTENSIONS = [".mp4", ".mov", ".m4v"]
+NATIVE_EXIF_EXTENSIONS = [".jpg", ".jpeg", ".heic"]
+DEFAULT_INBOX = r"E:\Inbox"
+DRIVE_ROOT = os.path.splitdrive(DEFAULT_INBOX)[0] + os.sep
+VIDEO_BASE_DIR, PHOTO_BASE_DIR = os.path.join(DRIVE_ROOT, "Videos", "Locomotives"), os.path.join(DRIVE_ROOT, "Photography", "Locomotives")
+
+ffmpeg_exe = r"C:\ffmpeg\bin\ffmpeg.exe"
+ffprobe_exe = ffmpeg_exe.replace("ffmpeg.exe", "ffprobe.exe")
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), "video_sorter_data.json")
+PROBE_CACHE_FILE = os.path.join(os.path.dirname(__file__), "video_sorter_probe_cache.json")
+PROBE_CACHE_MAX_ENTRIES = 20000
+PREFETCH_WORKERS = 2
+PROBE_WORKERS = 4
+PREFETCH_AHEAD = 3
+PREFETCH_POLL_MS = 50
+META_DEBOUNCE_MS = 150
+TRANSFER_WORKERS = 4
+TRANSFER_PER_DEVICE = 1
+TRANSFER_POLL_MS = 250
+COPY_CHUNK = 8 * 1024 * 1024
+# "readback": hash while copying, then re-read the copy once and compare
+# (its cached pages are dropped first where the OS allows - POSIX only - so
+# on Windows this checks the write path, not what reached the disk);
+# "trust": keep the write-side hash only; "size": the old size comparison.
+# Hashing reads the bytes through Python, so the kernel copy_file_range /
+# sendfile fast path is only used with "size".
+VERIFY_MODE = "readback"
+# "xxh3"/"xxh64" need the xxhash package (pip install xxhash) and fall back to
+# "blake2b" (stdlib) without it; xxh3 keeps up with the disk, blake2b doesn't
+HASH_ALGORITHM = "xxh3"
+MOVE_LOG_FILE = os.path.join(os.path.dirname(__file__), "video_sorter_moves.jsonl")
+# Every queued move is journalled (planned, copying, verified, removed) so a
+# crashed session's unfinished moves can be finished on the next start
+JOURNAL_FILE = os.path.join(os.path.dirname(__file__), "video_sorter_journal.jsonl")
+# Deadlines for external tools: past these the process is killed and the
+# file flagged as hung (and not tried again this session). Proxies get
+# PROXY_TIMEOUT_S plus PROXY_TIMEOUT_FACTOR x the clip's duration.
+FFPROBE_TIMEOUT_S = 20
+FFMPEG_TIMEOUT_S = 60
+PROXY_TIMEOUT_S = 600
+PROXY_TIMEOUT_FACTOR = 10
+PREVIEW_SIZE = 400
+FILMSTRIP_FRAMES = 5
+FILMSTRIP_HEIGHT = 72
+THUMB_CACHE_DIR = os.path.join(os.path.dirname(__file__), "video_sorter_thumbs")
+THUMB_MEMORY_ITEMS = 64
+THUMB_DISK_BYTES = 256 * 1024 * 1024
+DB_FILE = os.path.join(os.path.dirname(__file__), "video_sorter.db")
+# Proxies: optional low-res H.264 copies of sorted clips for editing, written
+# to a Proxies folder next to each clip by at most PROXY_WORKERS ffmpeg
+# processes running at low CPU (nice/BELOW_NORMAL) and idle I/O priority
+PROXY_ENABLED = False
+PROXY_DIR_NAME = "Proxies"
+PROXY_HEIGHT = 540
+PROXY_WORKERS = 1
+PROXY_NICE = 15
+# Duplicate check: size, then a hash of head/middle/tail samples, then the full hash
+DUP_SAMPLE_BYTES = 64 * 1024
+LIBRARY_SKIP_DIRS = {PROXY_DIR_NAME}
+# Inbox scan: include globs (None = the media extensions above) and exclude
+# globs, both matched against entry names; excluded folders aren't entered
+INBOX_INCLUDE = None
+INBOX_EXCLUDE = [".*", PROXY_DIR_NAME, "$RECYCLE.BIN", "System Volume Information"]
+SCAN_POLL_MS = 100
+# Watch mode: a file counts as landed once its size/mtime hold still this
+# long; the polling fallback rescans this often; landed files are probed and
+# thumbnailed on this many workers
+WATCH_STABLE_S = 2.0
+WATCH_POLL_S = 2.0
+WATCH_WARM_WORKERS = 2
+# Burst grouping: neighbouring inbox files whose preview dHashes differ in at
+# most SIMILAR_MAX_BITS of 64 and were captured within SIMILAR_GAP_S of each
+# other are proposed as one Apply-to-N group. Each file is compared with up to
+# SIMILAR_WINDOW files before it, so one odd frame doesn't split a burst.
+SIMILAR_MAX_BITS = 10
+SIMILAR_GAP_S = 20
+SIMILAR_WINDOW = 3
+# Where a dry run writes its plan (.csv or .json)
+PLAN_EXPORT_FILE = os.path.join(os.path.dirname(__file__), "video_sorter_plan.csv")
+# Tracing (--trace FILE): newest events kept, and how often the GUI stats line refreshes
+TRACE_MAX_EVENTS = 200000
+TRACE_STATS_MS = 1000
+# Combobox suggestions: how many to show, and how fast "recently used" fades
+COMPLETE_LIMIT = 40
+COMPLETE_HALF_LIFE_DAYS = 30
+
+QUARANTINE_DIR = os.path.join(DRIVE_ROOT, "FileSorter_Quarantine")
+
+
+class Tracer:
+    # Timing spans and counters for finding where a session's time goes.
+    # Off unless --trace is given; every hook tests .enabled first, so the
+    # disabled cost is one attribute check per call.
+
+    def __init__(self, max_events=TRACE_MAX_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self.totals = {}
+        self.counters = {}
+        self.threads = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def record(self, name, start, end, args=None):
+        tid = threading.get_ident()
+        with self.lock:
+            self.events.append((name, start, end - start, tid, args))
+            t = self.totals.setdefault(name, [0, 0.0])
+            t[0] += 1
+            t[1] += end - start
+            if tid not in self.threads:
+                self.threads[tid] = threading.current_thread().name
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def _span(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), args)
+
+    def span(self, name, **args):
+        return self._span(name, args or None) if self.enabled else nullcontext()
+
+    def summary_text(self):
+        with self.lock:
+            top = sorted(self.totals.items(), key=lambda kv: -kv[1][1])[:4]
+            counters = dict(self.counters)
+        parts = [f"{name} {n}x {1000 * t / n:.0f} ms" for name, (n, t) in top]
+        spawns = sum(v for k, v in counters.items() if k.startswith("spawn."))
+        parts.append(f"{spawns} spawns")
+        parts.append(f"{counters.get('bytes_copied', 0) / 1e9:.2f} GB copied")
+        return "Trace: " + " | ".join(parts)
+
+    def export(self, path):
+        # .jsonl: one event per line then a totals line; anything else is
+        # Chrome trace JSON (chrome://tracing, Perfetto)
+        with self.lock:
+            events = list(self.events)
+            totals = {k: list(v) for k, v in self.totals.items()}
+            counters = dict(self.counters)
+            threads = dict(self.threads)
+        with open(path, "w", encoding="utf-8") as fh:
+            if path.lower().endswith(".jsonl"):
+                for name, start, dur, tid, args in events:
+                    rec = {
+                        "name": name,
+                        "start_ms": round((start - self.origin) * 1e3, 3),
+                        "dur_ms": round(dur * 1e3, 3),
+                        "thread": threads.get(tid, str(tid)),
+                    }
+                    if args:
+                        rec["args"] = args
+                    fh.write(json.dumps(rec) + "\n")
+                fh.write(json.dumps({"totals": totals, "counters": counters}) + "\n")
+            else:
+                pid = os.getpid()
+                trace = [
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "ts": (start - self.origin) * 1e6,
+                        "dur": dur * 1e6,
+                        "pid": pid,
+                        "tid": tid,
+                        "args": args or {},
+                    }
+                    for name, start, dur, tid, args in events
+                ]
+                trace += [
+                    {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": n}}
+                    for tid, n in threads.items()
+                ]
+                trace.append(
+                    {
+                        "name": "counters",
+                        "ph": "C",
+                        "ts": (time.perf_counter() - self.origin) * 1e6,
+                        "pid": pid,
+                        "args": counters,
+                    }
+                )
+                json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, fh)
+        return len(events)
+
+
+tracer = Tracer()
+
+
+def traced(name=None):
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                tracer.record(label, start, time.perf_counter())
+
+        return inner
+
+    return wrap
+
+
+class ToolTimeout(OSError):
+    pass
+
+
+hung_files = {}
+_hung_lock = threading.Lock()
+
+
+def flag_hung(path, reason):
+    path = os.path.abspath(path)
+    with _hung_lock:
+        hung_files[path] = reason
+    print(f"[WARNING] {path}: {reason}; skipping it for the rest of this session")
+
+
+def is_hung(path):
+    return os.path.abspath(path) in hung_files
+
+
+def run_tool(cmd, subject=None, timeout=None, **kwargs):
+    # Every ffmpeg/ffprobe call goes through here so spawns can be counted
+    # and none can hang: past the deadline the process is killed, subject
+    # (the media file) is flagged as hung and ToolTimeout is raised.
+    tool = os.path.splitext(os.path.basename(cmd[0]))[0]
+    if timeout is None:
+        timeout = FFPROBE_TIMEOUT_S if "ffprobe" in tool else FFMPEG_TIMEOUT_S
+    try:
+        if not tracer.enabled:
+            return subprocess.run(cmd, timeout=timeout, **kwargs)
+        tracer.count("spawn." + tool)
+        with tracer.span("spawn:" + tool):
+            return subprocess.run(cmd, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired:
+        reason = f"{tool} timed out after {timeout:g} s"
+        if tracer.enabled:
+            tracer.count("timeout." + tool)
+        if subject:
+            flag_hung(subject, reason)
+        raise ToolTimeout(errno.ETIMEDOUT, reason, subject)
+
+data_store = None
+probe_cache = None
+_probe_db = None
+_probe_lock = threading.Lock()
+
+
+def init_environment():
+    # Everything that used to run at import time; main() calls it once
+    if not os.path.exists(DRIVE_ROOT):
+        raise RuntimeError(f"Drive {DRIVE_ROOT} does not exist")
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    get_data_store()
+    get_probe_cache()
+
+
+def get_data_store():
+    global data_store
+    if data_store is None:
+        data_store = DataStore()
+    return data_store
+
+
+class DataStore:
+    # Known locos and locations, kept in DB_FILE next to the caches. Lookups
+    # go through indexes, each batch of files is one transaction, and every
+    # entry counts how often and when it was last used. An old
+    # video_sorter_data.json is imported on first run and left in place.
+
+    def __init__(self, db_path=None, json_path=None):
+        self.db = open_db(db_path)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS locos (name TEXT NOT NULL, number TEXT NOT NULL, "
+                "uses INTEGER NOT NULL DEFAULT 0, last_used REAL, PRIMARY KEY (name, number))"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS locos_number ON locos (number)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS locations (name TEXT PRIMARY KEY, "
+                "uses INTEGER NOT NULL DEFAULT 0, last_used REAL)"
+            )
+        self._migrate(json_path or DATA_FILE)
+
+    def _migrate(self, json_path):
+        # Only into an empty store: the JSON is tracked in git, so it stays
+        # put and an empty store is the only sign it hasn't been imported
+        if not os.path.exists(json_path) or self.db.execute(
+            "SELECT 1 FROM locos UNION ALL SELECT 1 FROM locations LIMIT 1"
+        ).fetchone():
+            return
+        try:
+            with open(json_path, "r", encoding="utf-8") as fh:
+                old = json.load(fh)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not read {json_path} for migration: {e}")
+            return
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO locos (name, number) VALUES (?, ?)",
+                [(l["name"], l["number"]) for l in old.get("locos", [])],
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO locations (name) VALUES (?)",
+                [(l,) for l in old.get("locations", [])],
+            )
+        print(f"[INFO] Imported {json_path} into {DB_FILE}")
+
+    @traced("DataStore.remember")
+    def remember(self, entries):
+        # entries: (loco_name, loco_number, location) per sorted file
+        now = time.time()
+        locos, locations = [], []
+        for loco_name, loco_number, location in entries:
+            if loco_name or loco_number:
+                locos.append((loco_name, loco_number, now))
+            if location:
+                locations.append((location, now))
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT INTO locos (name, number, uses, last_used) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (name, number) DO UPDATE SET uses = uses + 1, "
+                "last_used = excluded.last_used",
+                locos,
+            )
+            self.db.executemany(
+                "INSERT INTO locations (name, uses, last_used) VALUES (?, 1, ?) "
+                "ON CONFLICT (name) DO UPDATE SET uses = uses + 1, "
+                "last_used = excluded.last_used",
+                locations,
+            )
+
+    def _column(self, sql, args=()):
+        with self.lock:
+            return [row[0] for row in self.db.execute(sql, args)]
+
+    def usage(self, kind):
+        # (text, uses, last_used) rows for a CompletionIndex
+        sql = {
+            "name": "SELECT name, SUM(uses), MAX(last_used) FROM locos GROUP BY name",
+            "number": "SELECT number, SUM(uses), MAX(last_used) FROM locos GROUP BY number",
+            "location": "SELECT name, uses, last_used FROM locations",
+        }[kind]
+        with self.lock:
+            return self.db.execute(sql).fetchall()
+
+    def number_for(self, loco_name):
+        # The number most recently used with this name
+        found = self._column(
+            "SELECT number FROM locos WHERE name = ? ORDER BY last_used DESC, rowid LIMIT 1",
+            (loco_name,),
+        )
+        return found[0] if found else None
+
+    def name_for(self, loco_number):
+        found = self._column(
+            "SELECT name FROM locos WHERE number = ? ORDER BY last_used DESC, rowid LIMIT 1",
+            (loco_number,),
+        )
+        return found[0] if found else None
+
+
+class CompletionIndex:
+    # Suggestions for one combobox: prefix matches on the whole text or any
+    # word in it first, then fuzzy (in-order subsequence) matches, each
+    # ranked by how often and how recently the entry was used.
+
+    def __init__(self, rows=()):
+        self.items = {}
+        self.scores = {}
+        now = time.time()
+        for text, uses, last_used in rows:
+            if text and text not in self.items:
+                self.items[text] = [uses or 0, last_used or 0]
+                self.scores[text] = self._score(text, now)
+        self._build()
+
+    def add(self, text, uses=1, last_used=None):
+        if not text:
+            return
+        rec = self.items.get(text)
+        if rec is None:
+            self.items[text] = [uses, last_used or time.time()]
+        else:
+            rec[0] += uses
+            rec[1] = last_used or time.time()
+        old = self.scores.get(text)
+        self.scores[text] = self._score(text, time.time())
+        self._move(text, old)
+
+    def _score(self, text, now):
+        # Scored when added; recency drifting during one session doesn't matter
+        uses, last_used = self.items[text]
+        age_days = (now - last_used) / 86400 if last_used else float("inf")
+        return math.log1p(uses) + 2 * 0.5 ** (age_days / COMPLETE_HALF_LIFE_DAYS)
+
+    def _build(self):
+        # Every entry casefolded, one per line, best score first: a search
+        # reads the blob in rank order and stops once it has enough.
+        # ranks (negated scores) and starts (line offsets) run alongside.
+        self.lines = sorted(self.items, key=self.scores.__getitem__, reverse=True)
+        self.ranks = [-self.scores[t] for t in self.lines]
+        folded = [t.casefold() + "\n" for t in self.lines]
+        self.blob = "".join(folded)
+        self.starts, pos = [], 0
+        for t in folded:
+            self.starts.append(pos)
+            pos += len(t)
+
+    def _move(self, text, old):
+        # Take text's line out (old: its previous score, None if new) and put
+        # it back at its new rank; only the offsets in between change
+        line = text.casefold() + "\n"
+        w = len(line)
+        if old is None:
+            j = len(self.lines)
+        else:
+            j = bisect.bisect_left(self.ranks, -old)
+            while self.lines[j] != text:
+                j += 1
+            start = self.starts[j]
+            self.blob = self.blob[:start] + self.blob[start + w :]
+            del self.lines[j], self.ranks[j], self.starts[j]
+        rank = -self.scores[text]
+        i = bisect.bisect_right(self.ranks, rank)
+        # starts from j on still count the removed line
+        if i < j:
+            start = self.starts[i] if i < len(self.starts) else len(self.blob)
+            self.starts[i:j] = [p + w for p in self.starts[i:j]]
+        else:
+            start = self.starts[i] - w if i < len(self.starts) else len(self.blob)
+            self.starts[j:i] = [p - w for p in self.starts[j:i]]
+        self.blob = self.blob[:start] + line + self.blob[start:]
+        self.lines.insert(i, text)
+        self.ranks.insert(i, rank)
+        self.starts.insert(i, start)
+
+    def _search(self, pattern, found, limit, anchor=None):
+        # anchor: matches must start a "line" (entry) or a "word"
+        for m in re.finditer(pattern, self.blob):
+            i = m.start()
+            if anchor and i:
+                before = self.blob[i - 1]
+                if not (before == "\n" or anchor == "word" and before.isspace()):
+                    continue
+            found.setdefault(self.lines[bisect.bisect_right(self.starts, i) - 1])
+            if len(found) >= limit:
+                return
+
+    def complete(self, query, limit=COMPLETE_LIMIT):
+        q = query.strip().casefold()
+        if not q:
+            return self.lines[:limit]
+        found = {}
+        # Start of the text, or of any word in it when q is a single word.
+        # A plain literal keeps the regex engine on its fast substring scan.
+        anchor = "line" if any(c.isspace() for c in q) else "word"
+        self._search(re.escape(q), found, limit, anchor)
+        if len(found) < limit:
+            # c1 then [^c]*c per character: a subsequence test the regex
+            # engine runs line by line, without runaway backtracking
+            chars = [re.escape(c) for c in q if not c.isspace()]
+            self._search(
+                chars[0] + "".join(f"[^\n{c}]*{c}" for c in chars[1:]), found, limit
+            )
+        return list(found)
+
+
+def load_probe_cache():
+    # Records live in DB_FILE, one row each, so a new probe is one upsert
+    # rather than a rewrite of the lot. An old PROBE_CACHE_FILE is imported
+    # once; only the newest PROBE_CACHE_MAX_ENTRIES are kept.
+    global _probe_db
+    _probe_db = open_db()
+    _probe_db.execute(
+        "CREATE TABLE IF NOT EXISTS probes (path TEXT PRIMARY KEY, "
+        "probed REAL, rec TEXT NOT NULL)"
+    )
+    if os.path.exists(PROBE_CACHE_FILE):
+        try:
+            with open(PROBE_CACHE_FILE, "r", encoding="utf-8") as fh:
+                old = json.load(fh)
+            _probe_db.executemany(
+                "INSERT OR IGNORE INTO probes (path, probed, rec) VALUES (?, ?, ?)",
+                [(p, r.get("probed", 0), json.dumps(r)) for p, r in old.items()],
+            )
+            _probe_db.commit()
+            os.remove(PROBE_CACHE_FILE)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not import {PROBE_CACHE_FILE}: {e}")
+    _probe_db.execute(
+        "DELETE FROM probes WHERE path NOT IN "
+        "(SELECT path FROM probes ORDER BY probed DESC LIMIT ?)",
+        (PROBE_CACHE_MAX_ENTRIES,),
+    )
+    _probe_db.commit()
+    rows = _probe_db.execute("SELECT path, rec FROM probes").fetchall()
+    return {p: json.loads(r) for p, r in rows}
+
+
+def _store_probe(path, rec):
+    # Caller holds _probe_lock; rec None drops the row
+    if _probe_db is None:
+        return
+    try:
+        if rec is None:
+            _probe_db.execute("DELETE FROM probes WHERE path = ?", (path,))
+        else:
+            _probe_db.execute(
+                "INSERT OR REPLACE INTO probes (path, probed, rec) VALUES (?, ?, ?)",
+                (path, rec.get("probed", 0), json.dumps(rec)),
+            )
+        _probe_db.commit()
+    except Exception as e:
+        print(f"[WARNING] Could not save probe of {path}: {e}")
+
+
+def cached_probe(path):
+    # probe_media's record if it's already known and current; never probes
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cache = get_probe_cache()
+    with _probe_lock:
+        rec = cache.get(path)
+    if rec and rec["size"] == st.st_size and rec["mtime"] == st.st_mtime_ns:
+        return rec
+    return None
+
+
+def rekey_probe(src, dest):
+    # After a move the probe record (or hung flag) follows the file, so the
+    # library side never probes it again
+    src, dest = os.path.abspath(src), os.path.abspath(dest)
+    try:
+        st = os.stat(dest)
+    except OSError:
+        return
+    cache = get_probe_cache()
+    with _probe_lock:
+        rec = cache.pop(src, None)
+        if rec:
+            _store_probe(src, None)
+        if rec and rec["size"] == st.st_size:
+            cache[dest] = dict(rec, mtime=st.st_mtime_ns)
+            _store_probe(dest, cache[dest])
+    with _hung_lock:
+        if src in hung_files:
+            hung_files[dest] = hung_files.pop(src)
+
+
+def get_probe_cache():
+    global probe_cache
+    with _probe_lock:
+        if probe_cache is None:
+            probe_cache = load_probe_cache()
+        return probe_cache
+
+
+def _run_ffprobe(path):
+    r = run_tool(
+        [
+            ffprobe_exe,
+            "-v",
+            "error",
+            "-print_format",
+            "json",
+            "-show_format",
+            "-show_streams",
+            path,
+        ],
+        subject=path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    return json.loads(r.stdout)
+
+
+def _parse_probe(info):
+    fmt = info.get("format", {})
+    vs = next(
+        (s for s in info.get("streams", []) if s.get("codec_type") == "video"), None
+    )
+    rec = {
+        "duration": float(fmt.get("duration") or 0.0),
+        "creation_time": fmt.get("tags", {}).get("creation_time"),
+        "width": None,
+        "height": None,
+        "rotation": 0,
+        "codec": None,
+    }
+    if vs:
+        rec["width"], rec["height"] = int(vs["width"]), int(vs["height"])
+        rec["codec"] = vs.get("codec_name")
+        if "tags" in vs and "rotate" in vs["tags"]:
+            rec["rotation"] = int(vs["tags"]["rotate"])
+        for d in vs.get("side_data_list", []):
+            if "rotation" in d:
+                rec["rotation"] = int(d["rotation"])
+        if not rec["duration"]:
+            rec["duration"] = float(vs.get("duration") or 0.0)
+        if not rec["creation_time"]:
+            rec["creation_time"] = vs.get("tags", {}).get("creation_time")
+    return rec
+
+
+MP4_EPOCH = datetime(1904, 1, 1, tzinfo=timezone.utc)
+MP4_CODECS = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "hevc",
+    b"hev1": "hevc",
+    b"mp4v": "mpeg4",
+    b"av01": "av1",
+    b"vp09": "vp9",
+    b"apch": "prores",
+    b"apcn": "prores",
+    b"apcs": "prores",
+    b"apco": "prores",
+    b"ap4h": "prores",
+    b"mjpa": "mjpeg",
+    b"jpeg": "mjpeg",
+}
+
+
+def _iter_boxes(fh, start, end):
+    # ISO-BMFF box walk: yields (type, payload_start, box_end), reading
+    # only the 8/16 byte headers so a trailing moov costs a few seeks.
+    pos = start
+    while pos + 8 <= end:
+        fh.seek(pos)
+        hdr = fh.read(8)
+        if len(hdr) < 8:
+            return
+        size, kind = struct.unpack(">I4s", hdr)
+        hlen = 8
+        if size == 1:
+            size = struct.unpack(">Q", fh.read(8))[0]
+            hlen = 16
+        elif size == 0:
+            size = end - pos
+        if size < hlen:
+            return
+        yield kind, pos + hlen, min(pos + size, end)
+        pos += size
+
+
+def _find_box(fh, start, end, *path):
+    for kind, s, e in _iter_boxes(fh, start, end):
+        if kind == path[0]:
+            return (s, e) if len(path) == 1 else _find_box(fh, s, e, *path[1:])
+    return None
+
+
+def _parse_trak(fh, start, end):
+    hdlr = _find_box(fh, start, end, b"mdia", b"hdlr")
+    if not hdlr:
+        return None
+    fh.seek(hdlr[0] + 8)
+    if fh.read(4) != b"vide":
+        return None
+    tkhd = _find_box(fh, start, end, b"tkhd")
+    if not tkhd:
+        return None
+    fh.seek(tkhd[0])
+    data = fh.read(tkhd[1] - tkhd[0])
+    off = 36 if data[0] == 1 else 24
+    m = struct.unpack(">9i", data[off + 16 : off + 52])
+    w, h = struct.unpack(">II", data[off + 52 : off + 60])
+    # Same sign convention as ffprobe's display matrix "rotation"
+    rotation = -round(math.degrees(math.atan2(m[1], m[0])))
+    codec = None
+    stsd = _find_box(fh, start, end, b"mdia", b"minf", b"stbl", b"stsd")
+    if stsd:
+        fh.seek(stsd[0] + 12)
+        fourcc = fh.read(4)
+        codec = MP4_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+    return {
+        "width": w >> 16,
+        "height": h >> 16,
+        "rotation": 180 if rotation == -180 else rotation,
+        "codec": codec,
+    }
+
+
+def read_mp4_header(path):
+    # mvhd creation time/duration plus the first video track's tkhd matrix
+    # and size; None if this isn't an ISO-BMFF file with a video track.
+    with open(path, "rb") as fh:
+        end = os.fstat(fh.fileno()).st_size
+        moov = _find_box(fh, 0, end, b"moov")
+        if not moov:
+            return None
+        rec = {
+            "duration": 0.0,
+            "creation_time": None,
+            "width": None,
+            "height": None,
+            "rotation": 0,
+            "codec": None,
+        }
+        for kind, s, e in _iter_boxes(fh, *moov):
+            if kind == b"mvhd":
+                fh.seek(s)
+                data = fh.read(min(e - s, 32))
+                if data[0] == 1:
+                    ctime, _, timescale, duration = struct.unpack(">QQIQ", data[4:32])
+                else:
+                    ctime, _, timescale, duration = struct.unpack(">IIII", data[4:20])
+                if timescale:
+                    rec["duration"] = duration / timescale
+                if ctime:
+                    dt = MP4_EPOCH + timedelta(seconds=ctime)
+                    rec["creation_time"] = dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            elif kind == b"trak" and rec["width"] is None:
+                trak = _parse_trak(fh, s, e)
+                if trak:
+                    rec.update(trak)
+        return rec if rec["width"] else None
+
+
+def _tiff_datetime_original(tiff):
+    # IFD0 -> ExifIFD (0x8769) -> DateTimeOriginal (0x9003)
+    bo = {b"II": "<", b"MM": ">"}[tiff[:2]]
+
+    def ifd_entries(offset):
+        (count,) = struct.unpack(bo + "H", tiff[offset : offset + 2])
+        for i in range(count):
+            e = offset + 2 + i * 12
+            yield struct.unpack(bo + "HHII", tiff[e : e + 12])
+
+    (ifd0,) = struct.unpack(bo + "I", tiff[4:8])
+    exif_ifd = next((v for t, _, _, v in ifd_entries(ifd0) if t == 0x8769), None)
+    if exif_ifd is None:
+        return None
+    for tag, _, count, value in ifd_entries(exif_ifd):
+        if tag == 0x9003:
+            raw = tiff[value : value + count].rstrip(b"\x00").decode("ascii")
+            return datetime.strptime(raw, "%Y:%m:%d %H:%M:%S")
+    return None
+
+
+def _jpeg_exif_block(fh):
+    if fh.read(2) != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    while True:
+        marker, length = struct.unpack(">2sH", fh.read(4))
+        if marker[0] != 0xFF or marker[1] == 0xDA:
+            return None
+        seg = fh.read(length - 2)
+        if marker[1] == 0xE1 and seg.startswith(b"Exif\x00\x00"):
+            return seg[6:]
+
+
+def _heic_exif_block(fh):
+    end = os.fstat(fh.fileno()).st_size
+    meta = _find_box(fh, 0, end, b"meta")
+    if not meta:
+        return None
+    fh.seek(meta[0])
+    buf = io.BytesIO(fh.read(meta[1] - meta[0]))
+    size = len(buf.getvalue())
+    exif_id, locs = None, {}
+    for kind, s, e in _iter_boxes(buf, 4, size):
+        buf.seek(s)
+        data = buf.read(e - s)
+        if kind == b"iinf":
+            pos = 6 if data[0] == 0 else 8
+            for k, bs, be in _iter_boxes(io.BytesIO(data), pos, len(data)):
+                infe = data[bs:be]
+                if k == b"infe" and infe[0] >= 2:
+                    id_len = 2 if infe[0] == 2 else 4
+                    item_id = int.from_bytes(infe[4 : 4 + id_len], "big")
+                    if infe[4 + id_len + 2 : 4 + id_len + 6] == b"Exif":
+                        exif_id = item_id
+        elif kind == b"iloc":
+            version = data[0]
+            off_size, len_size = data[4] >> 4, data[4] & 15
+            base_size, idx_size = data[5] >> 4, data[5] & 15
+            pos = 6
+            id_len = 2 if version < 2 else 4
+            count = int.from_bytes(data[pos : pos + id_len], "big")
+            pos += id_len
+            for _ in range(count):
+                item_id = int.from_bytes(data[pos : pos + id_len], "big")
+                pos += id_len + (2 if version in (1, 2) else 0) + 2
+                base = int.from_bytes(data[pos : pos + base_size], "big")
+                pos += base_size
+                extents = int.from_bytes(data[pos : pos + 2], "big")
+                pos += 2
+                for i in range(extents):
+                    if version in (1, 2):
+                        pos += idx_size
+                    off = int.from_bytes(data[pos : pos + off_size], "big")
+                    length = int.from_bytes(
+                        data[pos + off_size : pos + off_size + len_size], "big"
+                    )
+                    pos += off_size + len_size
+                    if i == 0:
+                        locs[item_id] = (base + off, length)
+    if exif_id not in locs:
+        return None
+    offset, length = locs[exif_id]
+    fh.seek(offset)
+    item = fh.read(length)
+    (skip,) = struct.unpack(">I", item[:4])
+    return item[4 + skip :]
+
+
+def read_exif_date(path):
+    # DateTimeOriginal straight from the JPEG APP1 segment or the HEIC Exif
+    # item. Returns None when the file has no date; raises when it can't tell.
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in NATIVE_EXIF_EXTENSIONS:
+        raise ValueError(f"no native EXIF reader for {ext}")
+    with open(path, "rb") as fh:
+        tiff = _heic_exif_block(fh) if ext == ".heic" else _jpeg_exif_block(fh)
+    return _tiff_datetime_original(tiff) if tiff else None
+
+
+@traced()
+def probe_media(path):
+    # One probe per file - MP4/MOV headers are parsed in-process, anything
+    # else goes to ffprobe - memoized by (path, size, mtime) and persisted
+    # in DB_FILE so a reopened inbox needs no subprocesses at all.
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    cache = get_probe_cache()
+    if path in hung_files:
+        return None
+    with _probe_lock:
+        rec = cache.get(path)
+    if rec and rec["size"] == st.st_size and rec["mtime"] == st.st_mtime_ns:
+        return rec
+    rec = None
+    if os.path.splitext(path)[1].lower() in MP4_EXTENSIONS:
+        try:
+            rec = read_mp4_header(path)
+        except (OSError, ValueError, struct.error, IndexError):
+            rec = None
+    if rec:
+        rec["probe"] = "header"
+    else:
+        try:
+            info = _run_ffprobe(path)
+        except OSError:
+            return None
+        try:
+            rec = _parse_probe(info)
+        except Exception:
+            rec = {
+                "duration": 0.0,
+                "creation_time": None,
+                "width": None,
+                "height": None,
+                "rotation": 0,
+                "codec": None,
+            }
+        rec["probe"] = "ffprobe"
+    rec.update(size=st.st_size, mtime=st.st_mtime_ns, probed=time.time())
+    with _probe_lock:
+        cache[path] = rec
+        _store_probe(path, rec)
+    return rec
+
+
+def media_orientation(rec):
+    if not rec or not rec.get("width") or not rec.get("height"):
+        return "Unknown"
+    w, h = rec["width"], rec["height"]
+    if rec.get("rotation", 0) in [90, 270, -90, -270]:
+        w, h = h, w
+    return "Landscape" if w > h else "Portrait" if h > w else "Square"
+
+
+@traced()
+def get_video_duration(path):
+    rec = probe_media(path)
+    return rec["duration"] if rec else 0.0
+
+
+@traced()
+def get_capture_datetime(file_path):
+    # (datetime, locked, source) - the full timestamp behind get_recorded_date
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in VIDEO_EXTENSIONS:
+        try:
+            rec = probe_media(file_path)
+            if rec and rec["creation_time"]:
+                dt = datetime.fromisoformat(
+                    rec["creation_time"].replace("Z", "+00:00")
+                )
+                return dt, True, "Metadata"
+        except:
+            pass
+    elif ext in IMAGE_EXTENSIONS:
+        try:
+            dt = read_exif_date(file_path)
+            if dt:
+                return dt, True, "Metadata"
+        except Exception:
+            try:
+                img = Image.open(file_path)
+                exif = img._getexif()
+                if exif:
+                    for t, v in exif.items():
+                        if ExifTags.TAGS.get(t) == "DateTimeOriginal":
+                            dt = datetime.strptime(v, "%Y:%m:%d %H:%M:%S")
+                            return dt, True, "Metadata"
+            except:
+                pass
+    try:
+        dt = datetime.fromtimestamp(os.path.getmtime(file_path))
+        return dt, False, "Modified Date"
+    except:
+        return None
+
+
+@traced()
+def get_recorded_date(file_path):
+    r = get_capture_datetime(file_path)
+    if not r:
+        return None
+    dt, locked, src = r
+    return dt.year, dt.month, dt.day, locked, src
+
+
+@traced()
+def probe_video_orientation(path):
+    return media_orientation(probe_media(path))
+
+
+class ThumbnailCache:
+    # Decoded previews in a bounded in-memory LRU, backed by JPEGs on disk
+    # with a byte budget. Keys include size and mtime, so edited files miss.
+
+    def __init__(self, cache_dir, memory_items, disk_bytes):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.memory = OrderedDict()
+        self.disk = None
+        self.disk_total = 0
+        self.lock = threading.Lock()
+        self.memory_hits = self.disk_hits = self.misses = 0
+
+    def key(self, file_path, percent, size=PREVIEW_SIZE):
+        st = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}|{percent}|{size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _load_disk_index(self):
+        # name -> [bytes, last_used]; file mtime doubles as the LRU clock
+        self.disk = {}
+        self.disk_total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for e in it:
+                    if e.name.endswith(".jpg"):
+                        st = e.stat()
+                        self.disk[e.name] = [st.st_size, st.st_mtime]
+                        self.disk_total += st.st_size
+        except OSError:
+            pass
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return self.memory[key]
+            if self.disk is None:
+                self._load_disk_index()
+            on_disk = key + ".jpg" in self.disk
+        if on_disk:
+            path = os.path.join(self.cache_dir, key + ".jpg")
+            try:
+                img = Image.open(path)
+                img.load()
+                ts = img.info.get("comment", b"").decode("utf-8") or None
+                os.utime(path)
+            except (OSError, ValueError):
+                img = None
+            if img is not None:
+                with self.lock:
+                    self.disk_hits += 1
+                    if key + ".jpg" in self.disk:
+                        self.disk[key + ".jpg"][1] = time.time()
+                    self._remember(key, (img, ts))
+                return img, ts
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, img, ts_str):
+        with self.lock:
+            self._remember(key, (img, ts_str))
+            if self.disk is None:
+                self._load_disk_index()
+        name = key + ".jpg"
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            img.convert("RGB").save(
+                path, "JPEG", quality=85, comment=(ts_str or "").encode("utf-8")
+            )
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"[WARNING] Could not write thumbnail: {e}")
+            return
+        with self.lock:
+            old = self.disk.pop(name, None)
+            if old:
+                self.disk_total -= old[0]
+            self.disk[name] = [size, time.time()]
+            self.disk_total += size
+            if self.disk_total <= self.disk_bytes:
+                return
+            victims = []
+            for n, (b, _) in sorted(self.disk.items(), key=lambda kv: kv[1][1]):
+                if self.disk_total <= self.disk_bytes or n == name:
+                    break
+                victims.append(n)
+                self.disk_total -= b
+            for n in victims:
+                del self.disk[n]
+        for n in victims:
+            try:
+                os.remove(os.path.join(self.cache_dir, n))
+            except OSError:
+                pass
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def stats_text(self):
+        with self.lock:
+            return (
+                f"Thumbnails: {self.memory_hits} memory / {self.disk_hits} disk hits, "
+                f"{self.misses} misses, {len(self.memory)} in memory, "
+                f"{self.disk_total / 1048576:.1f} MB on disk"
+            )
+
+
+thumb_cache = ThumbnailCache(THUMB_CACHE_DIR, THUMB_MEMORY_ITEMS, THUMB_DISK_BYTES)
+
+
+def _grab_video_frame(file_path, ts):
+    # Input-side seek, scaled by ffmpeg and piped back as PPM - nothing is
+    # written next to the source clip.
+    r = run_tool(
+        [
+            ffmpeg_exe,
+            "-v",
+            "error",
+            "-nostdin",
+            "-ss",
+            f"{ts:.3f}",
+            "-i",
+            file_path,
+            "-an",
+            "-sn",
+            "-frames:v",
+            "1",
+            "-vf",
+            f"scale={PREVIEW_SIZE}:{PREVIEW_SIZE}:force_original_aspect_ratio=decrease",
+            "-f",
+            "image2pipe",
+            "-c:v",
+            "ppm",
+            "-",
+        ],
+        subject=file_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return Image.open(io.BytesIO(r.stdout)) if r.stdout else None
+
+
+@traced()
+def get_preview_image(file_path, percent):
+    try:
+        key = thumb_cache.key(file_path, percent)
+        hit = thumb_cache.get(key)
+        if hit:
+            return hit
+        if is_hung(file_path):
+            return None, None
+        ext = os.path.splitext(file_path)[1].lower()
+        ts_str = None
+        if ext in VIDEO_EXTENSIONS:
+            dur = get_video_duration(file_path)
+            ts = max(0, dur * (percent / 100)) if dur > 0 else 1.0
+            ts_str = f"{int(ts//3600):02d}:{int((ts%3600)//60):02d}:{ts%60:06.3f}"
+            img = _grab_video_frame(file_path, ts)
+            if img is None:
+                return None, None
+        elif ext in IMAGE_EXTENSIONS:
+            img = Image.open(file_path)
+            # JPEG only: decode at 1/2, 1/4 or 1/8 scale instead of full size
+            img.draft("RGB", (PREVIEW_SIZE, PREVIEW_SIZE))
+            ts_str = "Image file"
+        else:
+            return None, None
+        img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+        thumb_cache.put(key, img, ts_str)
+        return img, ts_str
+    except:
+        return None, None
+
+
+def filmstrip_percents(frames=FILMSTRIP_FRAMES):
+    # Evenly spaced, e.g. 10/30/50/70/90 for five frames
+    return [round((i + 0.5) * 100 / frames) for i in range(frames)]
+
+
+def _split_ppm_stream(data):
+    imgs, pos = [], 0
+    while pos < len(data):
+        m = re.match(rb"P6\s+(\d+)\s+(\d+)\s+(\d+)\s", data[pos : pos + 64])
+        if not m:
+            break
+        w, h = int(m.group(1)), int(m.group(2))
+        start = pos + m.end()
+        imgs.append(Image.frombytes("RGB", (w, h), data[start : start + w * h * 3]))
+        pos = start + w * h * 3
+    return imgs
+
+
+@traced()
+def get_filmstrip(file_path, frames=FILMSTRIP_FRAMES):
+    # All frames come from one ffmpeg run: each input seeks on its own, keeps
+    # a single frame and the frames are concatenated onto one PPM pipe. They
+    # go into thumb_cache under their percent so get_preview_image hits too.
+    if os.path.splitext(file_path)[1].lower() not in VIDEO_EXTENSIONS:
+        return []
+    try:
+        percents = filmstrip_percents(frames)
+        keys = [thumb_cache.key(file_path, p) for p in percents]
+        cached = [thumb_cache.get(k) for k in keys]
+        if all(cached):
+            return [(p, img, ts) for p, (img, ts) in zip(percents, cached)]
+        if is_hung(file_path):
+            return []
+        dur = get_video_duration(file_path)
+        if dur <= 0:
+            return []
+        cmd = [ffmpeg_exe, "-v", "error", "-nostdin"]
+        graph = []
+        for i, p in enumerate(percents):
+            cmd += ["-ss", f"{dur * p / 100:.3f}", "-i", file_path]
+            graph.append(
+                f"[{i}:v]trim=end_frame=1,scale={PREVIEW_SIZE}:{PREVIEW_SIZE}:"
+                f"force_original_aspect_ratio=decrease,setsar=1[v{i}]"
+            )
+        graph.append(
+            "".join(f"[v{i}]" for i in range(frames)) + f"concat=n={frames}:v=1:a=0[out]"
+        )
+        cmd += [
+            "-filter_complex",
+            ";".join(graph),
+            "-map",
+            "[out]",
+            "-vsync",
+            "passthrough",
+            "-f",
+            "image2pipe",
+            "-c:v",
+            "ppm",
+            "-",
+        ]
+        r = run_tool(
+            cmd,
+            subject=file_path,
+            # One seek and decode per frame
+            timeout=FFMPEG_TIMEOUT_S * max(1, frames // 2),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        imgs = _split_ppm_stream(r.stdout)
+        if len(imgs) != frames:
+            return []
+        strip = []
+        for p, key, img in zip(percents, keys, imgs):
+            ts = dur * p / 100
+            ts_str = f"{int(ts//3600):02d}:{int((ts%3600)//60):02d}:{ts%60:06.3f}"
+            thumb_cache.put(key, img, ts_str)
+            strip.append((p, img, ts_str))
+        return strip
+    except Exception:
+        return []
+
+
+def make_filmstrip_image(strip, height=FILMSTRIP_HEIGHT):
+    tiles = []
+    for _, img, _ in strip:
+        t = img.copy()
+        t.thumbnail((height * 4, height))
+        tiles.append(t)
+    out = Image.new("RGB", (sum(t.width for t in tiles) + 2 * (len(tiles) - 1), height))
+    x = 0
+    for t in tiles:
+        out.paste(t, (x, (height - t.height) // 2))
+        x += t.width + 2
+    return out
+
+
+def nearest_strip_frame(strip, percent):
+    return min(strip, key=lambda fr: abs(fr[0] - percent))
+
+
+def prefetch_file(file_path, percent, filmstrip=False, library=None):
+    # Everything show_current_file needs; runs on a worker thread, so no Tk here.
+    strip = get_filmstrip(file_path) if filmstrip else []
+    if strip:
+        _, img, ts_str = nearest_strip_frame(strip, percent)
+    else:
+        img, ts_str = get_preview_image(file_path, percent)
+    # A miss before the library refresh is done may not hold up afterwards
+    provisional = library is not None and not library.ready.is_set()
+    return {
+        "date": get_recorded_date(file_path),
+        "image": img,
+        "ts": ts_str,
+        "percent": percent,
+        "filmstrip": filmstrip,
+        "strip": strip,
+        "duplicate": library.find_duplicate(file_path) if library else None,
+        "provisional": provisional,
+    }
+
+
+@traced()
+def build_dest_path(
+    loco_name, loco_number, location, year, month, day, orientation, is_photo
+):
+    loco_folder = f"{loco_name}_{loco_number}".replace(" ", "")
+    date_str = f"{year:04d}-{month:02d}-{day:02d}"
+    if is_photo:
+        base = PHOTO_BASE_DIR
+        sub = os.path.join(
+            loco_folder, "Raw Stills", f"{date_str}_{location.replace(' ','')}"
+        )
+    else:
+        base = VIDEO_BASE_DIR
+        t_folder = "Shorts" if orientation == "Portrait" else "Landscape"
+    return os.path.join(
+        base,
+        (
+            sub
+            if is_photo
+            else os.path.join(
+                loco_folder,
+                "Raw Footage",
+                t_folder,
+                f"{date_str}_{location.replace(' ','')}",
+            )
+        ),
+    )
+
+def dest_file_name(loco_number, year, location, short_desc, ext, counter=0):
+    safe_loc = location.replace(" ", "")
+    safe_desc = short_desc.replace(" ", "") if short_desc else "Clip"
+    suffix = f"_{counter}" if counter else ""
+    return f"{loco_number}-{year}-{safe_loc}-{safe_desc}{suffix}{ext}"
+
+
+def quarantine_file(file_path):
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    shutil.move(file_path, os.path.join(QUARANTINE_DIR, os.path.basename(file_path)))
+
+def _kernel_copy_methods():
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append("copy_file_range")
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        methods.append("sendfile")
+    return methods
+
+
+def new_hasher(algorithm=None):
+    # Returns (name actually used, hash object)
+    algorithm = algorithm or HASH_ALGORITHM
+    if algorithm in ("xxh3", "xxh64"):
+        try:
+            import xxhash
+
+            return algorithm, (
+                xxhash.xxh3_128() if algorithm == "xxh3" else xxhash.xxh64()
+            )
+        except ImportError:
+            algorithm = "blake2b"
+    return algorithm, hashlib.new(algorithm)
+
+
+@traced()
+def hash_file(path, algorithm=None):
+    algorithm, h = new_hasher(algorithm)
+    buf = bytearray(COPY_CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as fh:
+        while True:
+            n = fh.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+            if tracer.enabled:
+                tracer.count("bytes_hashed", n)
+    return h.hexdigest()
+
+
+def drop_cached_pages(path):
+    # Make the next read come from the disk/card rather than the page cache.
+    # Dirty pages aren't dropped, which is why the copy fsyncs first.
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+    return True
+
+
+@traced()
+def copy_with_progress(src, dst, progress=None, hasher=None):
+    # Let the kernel move the data where it can (copy_file_range can even
+    # reflink/server-side copy); otherwise large readinto chunks, which is
+    # also the path used when the bytes need hashing on the way through.
+    methods = [] if hasher else _kernel_copy_methods()
+    # "xb": never overwrite a file that took this name after it was picked.
+    # The hashing thread is shut down on the way out, failed copy or not.
+    with open(src, "rb", buffering=0) as fin, open(dst, "xb", buffering=0) as fout, (
+        ThreadPoolExecutor(max_workers=1) if hasher else nullcontext()
+    ) as hash_pool:
+        size = os.fstat(fin.fileno()).st_size
+        done = chunk = 0
+        bufs = pending = None
+        while done < size:
+            n = None
+            if methods:
+                try:
+                    if methods[0] == "copy_file_range":
+                        n = os.copy_file_range(fin.fileno(), fout.fileno(), COPY_CHUNK)
+                    else:
+                        n = os.sendfile(fout.fileno(), fin.fileno(), done, COPY_CHUNK)
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP):
+                        raise
+                    # Not supported for this pair of files - try the next way
+                    methods.pop(0)
+                    fin.seek(done)
+                    fout.seek(done)
+                    continue
+            else:
+                if bufs is None:
+                    bufs = [memoryview(bytearray(COPY_CHUNK)) for _ in range(2)]
+                view = bufs[chunk % 2]
+                chunk += 1
+                n = fin.readinto(view)
+                written = 0
+                while written < n:
+                    written += fout.write(view[written:n])
+                if hasher:
+                    # hashlib drops the GIL, so hashing this chunk overlaps
+                    # reading/writing the next one in the other buffer
+                    if pending:
+                        pending.result()
+                    pending = hash_pool.submit(hasher.update, view[:n])
+            if not n:
+                break
+            done += n
+            if progress:
+                progress(done)
+        if pending:
+            pending.result()
+        os.fsync(fout.fileno())
+    if tracer.enabled:
+        tracer.count("bytes_copied", done)
+    shutil.copystat(src, dst)
+
+
+_move_log_lock = threading.Lock()
+
+
+def record_move(src, dest, size, method, algorithm=None, digest=None):
+    entry = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "src": src,
+        "dest": dest,
+        "size": size,
+        "method": method,
+        "hash_algorithm": algorithm,
+        "hash": digest,
+    }
+    with _move_log_lock:
+        try:
+            with open(MOVE_LOG_FILE, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"[WARNING] Could not write move log: {e}")
+
+
+class MoveJournal:
+    # Append-only: planned -> copying -> verified -> removed, or failed /
+    # abandoned. Each line is fsynced before the step it announces goes
+    # ahead, so after a crash the last line of a move says how far it got.
+    # The planned line carries the plan, so resuming needs no re-probing.
+
+    FINISHED = {"removed", "failed", "abandoned"}
+
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_FILE
+        self.lock = threading.Lock()
+        self.fh = None
+
+    def log(self, src, dest, state, **extra):
+        self.log_many([dict(src=src, dest=dest, state=state, **extra)])
+
+    def log_many(self, entries):
+        # One write and one fsync for the lot (a batch of planned moves)
+        stamp = datetime.now().isoformat(timespec="seconds")
+        lines = "".join(json.dumps({"time": stamp, **e}) + "\n" for e in entries)
+        if not lines:
+            return
+        with self.lock:
+            try:
+                if self.fh is None:
+                    # Don't glue onto a line cut short by a crash
+                    try:
+                        with open(self.path, "rb") as fh:
+                            fh.seek(-1, os.SEEK_END)
+                            torn = fh.read(1) != b"\n"
+                    except OSError:
+                        torn = False  # missing or empty
+                    self.fh = open(self.path, "a", encoding="utf-8")
+                    if torn:
+                        self.fh.write("\n")
+                self.fh.write(lines)
+                self.fh.flush()
+                os.fsync(self.fh.fileno())
+            except OSError as e:
+                print(f"[WARNING] Could not write move journal: {e}")
+
+    def unfinished(self):
+        # The latest state of every move that didn't finish, in journal order
+        moves = {}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    key = (e["src"], e["dest"])
+                    if e["state"] == "planned" or key not in moves:
+                        moves[key] = e
+                    else:
+                        moves[key].update(e)
+        except OSError:
+            return []
+        return [e for e in moves.values() if e["state"] not in self.FINISHED]
+
+    def compact(self):
+        # Keep only unfinished moves; the history lives in MOVE_LOG_FILE
+        keep = self.unfinished()
+        tmp = self.path + ".tmp"
+        with self.lock:
+            try:
+                if self.fh:
+                    self.fh.close()
+                    self.fh = None
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    for e in keep:
+                        fh.write(json.dumps(e) + "\n")
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"[WARNING] Could not compact move journal: {e}")
+
+    def close(self):
+        with self.lock:
+            if self.fh:
+                self.fh.close()
+                self.fh = None
+
+
+def recover_moves(journal):
+    # Settle what an earlier session left half done. A verified copy only
+    # needs its source removed; a rename that happened just gets closed off.
+    # Anything else is returned to be queued again (a partial destination of
+    # ours is deleted first), so no finished copy is ever redone.
+    redo = []
+    for e in journal.unfinished():
+        src, dest, state = e["src"], e["dest"], e["state"]
+        have_src, have_dest = os.path.exists(src), os.path.exists(dest)
+        if have_dest and not have_src:
+            journal.log(src, dest, "removed", recovered=True)
+            print(f"[OK] Recovered move: {dest}")
+        elif state == "verified" and have_dest and os.path.getsize(dest) == e["size"]:
+            try:
+                os.remove(src)
+            except OSError as err:
+                journal.log(src, dest, "failed", message=str(err))
+                continue
+            record_move(src, dest, e["size"], "copy", e["hash_algorithm"], e["hash"])
+            journal.log(src, dest, "removed", recovered=True)
+            print(f"[OK] Recovered move: {dest}")
+        elif not have_src:
+            journal.log(src, dest, "failed", message="Source and destination missing")
+            print(f"[ERROR] Lost track of {src}: neither it nor {dest} exists")
+        else:
+            if state != "planned" and have_dest:
+                # Our own unverified copy (or leftover hard link); start it again
+                os.remove(dest)
+            redo.append(e)
+    return redo
+
+
+def rename_no_clobber(src, dst):
+    # Same-volume move. Unlike os.replace this never overwrites a file that
+    # appeared at dst after its name was picked.
+    if os.name == "nt":
+        os.rename(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links on this filesystem (exFAT etc.)
+        if os.path.exists(dst):
+            raise FileExistsError(errno.EEXIST, "File exists", dst)
+        os.rename(src, dst)
+        return
+    os.unlink(src)
+
+
+@traced()
+def transfer_file(file_path, dest_file, progress=None, journal=None):
+    # Same volume: a plain rename. Otherwise copy (hashing the stream),
+    # verify, then remove the original; anything off sends the original to
+    # quarantine. Returns (status, message, digest) so callers can report it.
+    # Each step is written to journal (a MoveJournal) before it happens.
+    def note(state, **extra):
+        if journal:
+            journal.log(file_path, dest_file, state, **extra)
+
+    if device_key(file_path) == device_key(os.path.dirname(dest_file)):
+        try:
+            size = os.path.getsize(file_path)
+            note("copying", method="rename")
+            rename_no_clobber(file_path, dest_file)
+            if progress:
+                progress(size)
+            rekey_probe(file_path, dest_file)
+            record_move(file_path, dest_file, size, "rename")
+            note("removed")
+            print(f"[OK] Renamed on same volume to {dest_file}")
+            return "moved", dest_file, None
+        except FileExistsError:
+            print(f"[ERROR] Destination already exists: {dest_file}")
+            note("failed", message="Destination already exists")
+            return "failed", f"Destination already exists: {dest_file}", None
+        except OSError as e:
+            print(f"[INFO] Rename failed ({e}), copying instead.")
+
+    try:
+        print(f"[INFO] Copying: {file_path} -> {dest_file}")
+        algorithm, hasher = (None, None) if VERIFY_MODE == "size" else new_hasher()
+        note("copying", method="copy")
+        copy_with_progress(file_path, dest_file, progress, hasher)
+        digest = hasher.hexdigest() if hasher else None
+
+        if os.path.exists(dest_file):
+            src_size = os.path.getsize(file_path)
+            dst_size = os.path.getsize(dest_file)
+            if src_size != dst_size:
+                problem = "Size mismatch"
+            elif VERIFY_MODE == "readback":
+                drop_cached_pages(dest_file)
+                readback = hash_file(dest_file, algorithm)
+                problem = "Checksum mismatch" if readback != digest else None
+            else:
+                problem = None
+            if problem is None:
+                note("verified", size=src_size, hash_algorithm=algorithm, hash=digest)
+                os.remove(file_path)
+                rekey_probe(file_path, dest_file)
+                record_move(file_path, dest_file, src_size, "copy", algorithm, digest)
+                note("removed")
+                print(f"[OK] Moved successfully to {dest_file}")
+                return "moved", dest_file, digest
+            else:
+                print(f"[WARNING] {problem}! Moving original to quarantine.")
+                quarantine_file(file_path)
+                note("failed", message=f"{problem} after copy", quarantined=True)
+                return "quarantined", f"{problem} after copy", digest
+        else:
+            print(f"[ERROR] Destination file missing after copy! Moving original to quarantine.")
+            quarantine_file(file_path)
+            note("failed", message="Destination missing after copy", quarantined=True)
+            return "quarantined", "Destination file missing after copy", None
+
+    except FileExistsError:
+        # Someone else's file; the original stays where it is
+        print(f"[ERROR] Destination already exists: {dest_file}")
+        note("failed", message="Destination already exists")
+        return "failed", f"Destination already exists: {dest_file}", None
+    except Exception as e:
+        print(f"[MOVE ERROR] {e}")
+        print(f"[ACTION] Moving original to quarantine.")
+        try:
+            quarantine_file(file_path)
+        except Exception as qe:
+            print(f"[QUARANTINE ERROR] {qe}")
+            note("failed", message=f"{e}; quarantine also failed: {qe}")
+            return "failed", f"{e}; quarantine also failed: {qe}", None
+        note("failed", message=str(e), quarantined=True)
+        return "quarantined", str(e), None
+
+
+@traced()
+def move_and_rename(
+    file_path,
+    dest_dir,
+    loco_number,
+    year,
+    location,
+    short_desc,
+    dry_run,
+    index=None,
+    proxies=None,
+    catalog=None,
+    journal=None,
+):
+    ext = os.path.splitext(file_path)[1].lower()
+    dest_file, _ = (index or DestIndex()).pick(
+        dest_dir, loco_number, year, location, short_desc, ext
+    )
+
+    if dry_run:
+        print(f"[DryRun] Would move: {file_path} -> {dest_file}")
+        return dest_file
+
+    os.makedirs(dest_dir, exist_ok=True)
+    if journal:
+        journal.log(file_path, dest_file, "planned", size=os.path.getsize(file_path))
+    status, msg, digest = transfer_file(file_path, dest_file, journal=journal)
+    if catalog and status == "moved":
+        catalog.record(
+            dest_file,
+            dict(loco_number=loco_number, location=location, short_desc=short_desc),
+            digest,
+        )
+    if proxies and status == "moved":
+        proxies.submit(dest_file)
+    return dest_file
+
+
+def device_key(path):
+    # Identify the volume a path lives on (or would live on once created)
+    p = os.path.abspath(path)
+    while not os.path.exists(p) and os.path.dirname(p) != p:
+        p = os.path.dirname(p)
+    try:
+        return os.stat(p).st_dev
+    except OSError:
+        return os.path.splitdrive(p)[0] or p
+
+
+class TransferJob:
+    def __init__(self, src, dest):
+        self.src = src
+        self.dest = dest
+        self.size = os.path.getsize(src)
+        self.done = 0
+        self.status = "queued"
+        self.message = ""
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.digest = None
+
+
+class TransferQueue:
+    # Moves run on a worker pool; a semaphore per device keeps a card reader
+    # or a single spindle from being hit by more than per_device copies.
+
+    def __init__(
+        self, workers=TRANSFER_WORKERS, per_device=TRANSFER_PER_DEVICE, journal=None
+    ):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transfer")
+        self.journal = journal
+        self.per_device = per_device
+        self.device_slots = {}
+        self.jobs = []
+        self.unreported = []
+        self.lock = threading.Lock()
+        self.batch_started = None
+
+    def submit(self, src, dest, plan=None):
+        return self.submit_many([(src, dest, plan)])[0]
+
+    def submit_many(self, moves):
+        # moves: [(src, dest, plan)]; journalled together before any starts
+        jobs = [TransferJob(src, dest) for src, dest, _ in moves]
+        if self.journal:
+            self.journal.log_many(
+                dict(src=j.src, dest=j.dest, state="planned", size=j.size, plan=plan)
+                for j, (_, _, plan) in zip(jobs, moves)
+            )
+        with self.lock:
+            if not self.active_jobs():
+                self.jobs = [j for j in self.jobs if j.finished is None]
+                self.batch_started = time.time()
+            self.jobs.extend(jobs)
+        for job in jobs:
+            job.future = self.pool.submit(self._run, job)
+        return jobs
+
+    def _slots(self, job):
+        keys = {device_key(job.src), device_key(os.path.dirname(job.dest))}
+        if len(keys) == 1:
+            # Same volume: transfer_file renames, which costs no bandwidth
+            return []
+        with self.lock:
+            for k in keys:
+                if k not in self.device_slots:
+                    self.device_slots[k] = threading.Semaphore(self.per_device)
+            return [self.device_slots[k] for k in sorted(keys, key=str)]
+
+    def _run(self, job):
+        slots = self._slots(job)
+        for sem in slots:
+            sem.acquire()
+        try:
+            job.status = "copying"
+            job.started = time.time()
+            if os.path.exists(job.dest):
+                status, msg = "failed", f"Destination appeared while queued: {job.dest}"
+                if self.journal:
+                    self.journal.log(job.src, job.dest, "failed", message=msg)
+            else:
+                os.makedirs(os.path.dirname(job.dest), exist_ok=True)
+                status, msg, job.digest = transfer_file(
+                    job.src, job.dest, lambda n: setattr(job, "done", n), self.journal
+                )
+        except Exception as e:
+            status, msg = "failed", str(e)
+            if self.journal:
+                self.journal.log(job.src, job.dest, "failed", message=msg)
+        finally:
+            for sem in reversed(slots):
+                sem.release()
+        job.status, job.message = status, msg
+        if status == "moved":
+            job.done = job.size
+        job.finished = time.time()
+        with self.lock:
+            self.unreported.append(job)
+
+    def active_jobs(self):
+        return [j for j in self.jobs if j.finished is None]
+
+    def pending_sources(self):
+        with self.lock:
+            return {j.src for j in self.active_jobs()}
+
+    def pop_finished(self):
+        with self.lock:
+            done, self.unreported = self.unreported, []
+        return done
+
+    def snapshot(self):
+        with self.lock:
+            jobs = list(self.jobs)
+            started = self.batch_started
+        total = sum(j.size for j in jobs)
+        done = sum(j.size if j.finished else j.done for j in jobs)
+        elapsed = time.time() - started if started else 0
+        rate = done / elapsed if elapsed > 0 else 0
+        return {
+            "active": [j for j in jobs if j.status == "copying"],
+            "queued": sum(1 for j in jobs if j.status == "queued"),
+            "failed": sum(1 for j in jobs if j.finished and j.status != "moved"),
+            "total": total,
+            "done": done,
+            "rate": rate,
+            "eta": (total - done) / rate if rate > 0 else None,
+        }
+
+    def wait(self, report=None, interval=1.0):
+        last = time.time()
+        while True:
+            snap = self.snapshot()
+            if not snap["active"] and not snap["queued"]:
+                return snap
+            if report and time.time() - last >= interval:
+                report(snap)
+                last = time.time()
+            time.sleep(0.2)
+
+    def shutdown(self):
+        # Copies already running finish; queued ones never start
+        with self.lock:
+            for j in self.jobs:
+                if j.status == "queued" and j.future:
+                    j.future.cancel()
+        self.pool.shutdown(wait=False)
+
+
+def proxy_path(video_path):
+    d, name = os.path.split(video_path)
+    return os.path.join(d, PROXY_DIR_NAME, os.path.splitext(name)[0] + "_proxy.mp4")
+
+
+def proxy_command(src, dst):
+    # Shorter side scaled to PROXY_HEIGHT, so Shorts stay legible too
+    h = PROXY_HEIGHT
+    cmd = [
+        ffmpeg_exe,
+        "-v",
+        "error",
+        "-nostdin",
+        "-y",
+        "-i",
+        src,
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a:0?",
+        "-vf",
+        f"scale='if(gt(iw,ih),-2,{h})':'if(gt(iw,ih),{h},-2)'",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        "23",
+        "-pix_fmt",
+        "yuv420p",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "128k",
+        "-movflags",
+        "+faststart",
+        "-f",
+        "mp4",
+        dst,
+    ]
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    else:
+        if shutil.which("ionice"):
+            cmd = ["ionice", "-c", "3"] + cmd
+        if shutil.which("nice"):
+            cmd = ["nice", "-n", str(PROXY_NICE)] + cmd
+    return cmd, kwargs
+
+
+class ProxyQueue:
+    # Proxy jobs are rows in DB_FILE, so whatever was queued or mid-transcode
+    # when the sorter closed is picked up by resume() next time. A source
+    # whose size/mtime match a finished proxy is not transcoded again.
+    # ffmpeg does the work in its own process; each worker thread just
+    # babysits one low-priority ffmpeg at a time.
+
+    def __init__(self, workers=PROXY_WORKERS, db_path=None):
+        self.db = open_db(db_path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS proxy_jobs (src TEXT PRIMARY KEY, "
+            "proxy TEXT NOT NULL, size INTEGER NOT NULL, mtime INTEGER NOT NULL, "
+            "status TEXT NOT NULL, error TEXT, updated REAL NOT NULL)"
+        )
+        self.db.commit()
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.threads = []
+        self.procs = set()
+        self.stopping = False
+        self.made = self.failed = 0
+
+    def submit(self, src):
+        if os.path.splitext(src)[1].lower() not in VIDEO_EXTENSIONS:
+            return False
+        try:
+            st = os.stat(src)
+        except OSError:
+            return False
+        proxy = proxy_path(src)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size, mtime, status FROM proxy_jobs WHERE src = ?", (src,)
+            ).fetchone()
+            if row == (st.st_size, st.st_mtime_ns, "done") and os.path.exists(proxy):
+                return False
+            self.db.execute(
+                "INSERT OR REPLACE INTO proxy_jobs "
+                "(src, proxy, size, mtime, status, updated) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (src, proxy, st.st_size, st.st_mtime_ns, time.time()),
+            )
+            self.db.commit()
+            self.wake.notify()
+        self._start()
+        return True
+
+    def resume(self):
+        # Jobs an earlier session queued or was killed in the middle of
+        with self.lock:
+            self.db.execute(
+                "UPDATE proxy_jobs SET status = 'queued' WHERE status = 'running'"
+            )
+            self.db.commit()
+        n = self.pending()
+        if n:
+            print(f"[INFO] Resuming {n} proxy jobs")
+            self._start()
+        return n
+
+    def pending(self):
+        with self.lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM proxy_jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    def _start(self):
+        with self.lock:
+            if self.threads or self.stopping:
+                return
+            self.threads = [
+                threading.Thread(target=self._worker, name=f"proxy-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+        for t in self.threads:
+            t.start()
+
+    def _claim(self):
+        # Lock held: oldest queued job -> running
+        row = self.db.execute(
+            "SELECT src, proxy, size, mtime FROM proxy_jobs WHERE status = 'queued' "
+            "ORDER BY updated LIMIT 1"
+        ).fetchone()
+        if row:
+            self.db.execute(
+                "UPDATE proxy_jobs SET status = 'running' WHERE src = ?", (row[0],)
+            )
+            self.db.commit()
+        return row
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                job = None
+                while not self.stopping and job is None:
+                    job = self._claim()
+                    if job is None:
+                        self.wake.wait()
+                if self.stopping:
+                    return
+            status, error = self._transcode(*job)
+            with self.lock:
+                if self.stopping and status == "failed":
+                    # Killed by shutdown(): leave it for resume()
+                    status, error = "queued", None
+                self.db.execute(
+                    "UPDATE proxy_jobs SET status = ?, error = ?, updated = ? "
+                    "WHERE src = ?",
+                    (status, error, time.time(), job[0]),
+                )
+                self.db.commit()
+                self.made += status == "done"
+                self.failed += status == "failed"
+            if status == "done":
+                print(f"[OK] Proxy written: {job[1]}")
+            elif status == "failed":
+                print(f"[ERROR] Proxy failed for {job[0]}: {error}")
+
+    def _transcode(self, src, proxy, size, mtime):
+        if not os.path.exists(src):
+            return "failed", "source is gone"
+        tmp = proxy + ".part"
+        try:
+            os.makedirs(os.path.dirname(proxy), exist_ok=True)
+            cmd, kwargs = proxy_command(src, tmp)
+            if tracer.enabled:
+                tracer.count("spawn.ffmpeg")
+            with tracer.span("proxy", src=os.path.basename(src)):
+                p = subprocess.Popen(
+                    cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **kwargs
+                )
+                with self.lock:
+                    self.procs.add(p)
+                rec = probe_media(src)
+                deadline = PROXY_TIMEOUT_S + PROXY_TIMEOUT_FACTOR * (
+                    rec["duration"] if rec else 0
+                )
+                try:
+                    _, err = p.communicate(timeout=deadline)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+                    p.communicate()
+                    return "failed", f"ffmpeg timed out after {deadline:.0f} s"
+                finally:
+                    with self.lock:
+                        self.procs.discard(p)
+            if p.returncode == 0:
+                os.replace(tmp, proxy)
+                return "done", None
+            msg = err.decode("utf-8", "replace").strip().splitlines()
+            return "failed", msg[-1] if msg else f"ffmpeg exited with {p.returncode}"
+        except OSError as e:
+            return "failed", str(e)
+        finally:
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    def wait(self, report=None, interval=1.0):
+        last = time.time()
+        while True:
+            n = self.pending()
+            if not n:
+                return
+            if report and time.time() - last >= interval:
+                report(n)
+                last = time.time()
+            time.sleep(0.5)
+
+    def shutdown(self):
+        # Running transcodes are killed and stay queued for the next session
+        with self.lock:
+            self.stopping = True
+            self.wake.notify_all()
+            procs = list(self.procs)
+        for p in procs:
+            p.terminate()
+
+
+SUFFIX_RE = re.compile(r"^(.*?)(?:_(\d+))?(\.[^.]*)?$")
+
+
+def _split_suffix(name):
+    # "4472-2025-York-Run_3.mp4" -> ("4472-2025-york-run", ".mp4", 3)
+    m = SUFFIX_RE.match(os.path.normcase(name))
+    return m.group(1), m.group(3) or "", int(m.group(2) or 0)
+
+
+class DestIndex:
+    # One scandir per destination folder. Keeps the names in it plus the
+    # highest _N suffix seen per (stem, ext), so the next free name is a
+    # dict lookup and batch reservations never go back to the disk.
+
+    def __init__(self):
+        self.dirs = {}
+        self.lock = threading.Lock()
+        self.scans = 0
+
+    def _entry(self, d):
+        if d not in self.dirs:
+            names, top = set(), {}
+            try:
+                with os.scandir(d) as it:
+                    for e in it:
+                        names.add(os.path.normcase(e.name))
+                        stem, ext, n = _split_suffix(e.name)
+                        if n >= top.get((stem, ext), -1):
+                            top[(stem, ext)] = n
+                self.scans += 1
+            except OSError:
+                names = top = None
+            self.dirs[d] = (names, top)
+        return self.dirs[d]
+
+    def exists(self, d):
+        with self.lock:
+            return self._entry(d)[0] is not None
+
+    def pick(self, dest_dir, loco_number, year, location, short_desc, ext, reserve=True):
+        # Returns (dest_file, conflict); reserve=True claims the name
+        with self.lock:
+            names, top = self._entry(dest_dir)
+            if names is None:
+                names, top = set(), {}
+                if reserve:
+                    self.dirs[dest_dir] = (names, top)
+            base, e = os.path.splitext(dest_file_name(loco_number, year, location, short_desc, ext))
+            key = (os.path.normcase(base), os.path.normcase(e))
+            counter = top.get(key, -1) + 1
+            name = dest_file_name(loco_number, year, location, short_desc, ext, counter)
+            # A short_desc that itself ends in _N can still collide; step past it
+            while os.path.normcase(name) in names:
+                counter += 1
+                name = dest_file_name(loco_number, year, location, short_desc, ext, counter)
+            if reserve:
+                names.add(os.path.normcase(name))
+                top[key] = counter
+            return os.path.join(dest_dir, name), counter > 0
+
+    def claim(self, dest_file):
+        # Reserve a name picked in an earlier session (a resumed move)
+        d, name = os.path.split(dest_file)
+        with self.lock:
+            names, top = self._entry(d)
+            if names is None:
+                names, top = set(), {}
+                self.dirs[d] = (names, top)
+            names.add(os.path.normcase(name))
+            stem, ext, n = _split_suffix(name)
+            if n >= top.get((stem, ext), -1):
+                top[(stem, ext)] = n
+
+    def forget(self):
+        with self.lock:
+            self.dirs.clear()
+
+
+def open_db(path=None):
+    import sqlite3
+
+    db = sqlite3.connect(path or DB_FILE, timeout=30, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def sample_hash(path, size):
+    # Cheap content key: the size plus head, middle and tail chunks
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as fh:
+        if size <= 3 * DUP_SAMPLE_BYTES:
+            h.update(fh.read())
+        else:
+            for off in (0, size // 2 - DUP_SAMPLE_BYTES // 2, size - DUP_SAMPLE_BYTES):
+                fh.seek(off)
+                h.update(fh.read(DUP_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+def full_hash(path):
+    name, _ = new_hasher()
+    return f"{name}:{hash_file(path, name)}"
+
+
+class LibraryIndex:
+    # Duplicate checks against everything already sorted under the library
+    # roots. Sizes come from the Catalog's rows, and sampled/full hashes are
+    # stored back on them as they're worked out, so 100k+ files don't get
+    # re-read. Only files whose size matches an inbox file are ever hashed.
+    # Until refresh() has caught the catalog up, a miss may just mean the
+    # file hasn't been reached yet: ready is set once it has.
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.memo = {}
+        self.pending = {}
+
+    def refresh(self):
+        try:
+            self.catalog.refresh()
+        finally:
+            self.ready.set()
+
+    def claim(self, path):
+        # An inbox file that's about to be sorted counts as library content,
+        # so a second copy of it in the same inbox is caught too
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self.lock:
+            self.pending[path] = size
+
+    def _hashes(self, path, st):
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            return self.memo.setdefault(key, {})
+
+    @traced("LibraryIndex.find_duplicate")
+    def find_duplicate(self, path):
+        # Library (or claimed) path with identical content, or None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self.catalog.lock:
+            rows = self.catalog.db.execute(
+                "SELECT path, mtime, sample, hash FROM catalog WHERE size = ?",
+                (st.st_size,),
+            ).fetchall()
+        with self.lock:
+            rows += [
+                (p, None, None, None)
+                for p, size in self.pending.items()
+                if size == st.st_size and p != path
+            ]
+        if not rows:
+            return None
+        mine = self._hashes(path, st)
+        try:
+            if "sample" not in mine:
+                mine["sample"] = sample_hash(path, st.st_size)
+            for other, mtime, sample, full in rows:
+                if os.path.normcase(os.path.abspath(other)) == os.path.normcase(
+                    os.path.abspath(path)
+                ):
+                    continue
+                try:
+                    ost = os.stat(other)
+                    if ost.st_size != st.st_size:
+                        continue
+                    if ost.st_mtime_ns != mtime:
+                        # Rewritten in place since the catalog saw it
+                        sample = full = None
+                    theirs = self._hashes(other, ost)
+                    if sample is None:
+                        sample = theirs.get("sample") or sample_hash(other, ost.st_size)
+                        theirs["sample"] = sample
+                        self._store(other, ost, sample=sample)
+                    if sample != mine["sample"]:
+                        continue
+                    if "full" not in mine:
+                        mine["full"] = full_hash(path)
+                    if full is None or not full.startswith(mine["full"].split(":")[0] + ":"):
+                        full = theirs.get("full") or full_hash(other)
+                        theirs["full"] = full
+                        self._store(other, ost, hash=full)
+                except OSError:
+                    continue
+                if full == mine["full"]:
+                    return other
+        except OSError as e:
+            print(f"[WARNING] Duplicate check failed for {path}: {e}")
+        return None
+
+    def _store(self, path, st, **hashes):
+        with self.lock:
+            if path in self.pending:
+                return
+        with self.catalog.lock:
+            for col, value in hashes.items():
+                self.catalog.db.execute(
+                    f"UPDATE catalog SET {col} = ? "
+                    "WHERE path = ? AND size = ? AND mtime = ?",
+                    (value, path, st.st_size, st.st_mtime_ns),
+                )
+            self.catalog.db.commit()
+
+
+LIBRARY_PATH_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})_(.*)$")
+
+
+def parse_library_path(path):
+    # Recover what build_dest_path/dest_file_name put into a library path.
+    # Spaces were stripped when the path was built, so names come back
+    # without them. None if the path isn't under a library root.
+    for base, kind in ((VIDEO_BASE_DIR, "video"), (PHOTO_BASE_DIR, "photo")):
+        if not path.startswith(os.path.join(base, "")):
+            continue
+        parts = os.path.relpath(path, base).split(os.sep)
+        facts = {"kind": kind}
+        if kind == "video" and len(parts) == 5 and parts[1] == "Raw Footage":
+            facts["orientation"] = "Portrait" if parts[2] == "Shorts" else "Landscape"
+        elif not (kind == "photo" and len(parts) == 4 and parts[1] == "Raw Stills"):
+            return facts
+        loco_name, _, loco_number = parts[0].rpartition("_")
+        m = LIBRARY_PATH_RE.match(parts[-2])
+        facts.update(loco_name=loco_name, loco_number=loco_number)
+        if m:
+            year, month, day, location = m.groups()
+            facts.update(
+                year=int(year), month=int(month), day=int(day), location=location
+            )
+            stem = SUFFIX_RE.match(parts[-1]).group(1)
+            prefix = f"{loco_number}-{year}-{location}-"
+            if stem.startswith(prefix):
+                facts["short_desc"] = stem[len(prefix) :]
+        return facts
+    return None
+
+
+CATALOG_FIELDS = [
+    "path", "kind", "loco_name", "loco_number", "location", "year", "month", "day",
+    "orientation", "short_desc", "size", "duration", "hash", "source",
+]
+CATALOG_TEXT_FIELDS = {"loco_name", "location", "short_desc"}
+
+
+class Catalog:
+    # What's in the sorted library, one row per file, queryable by any of
+    # CATALOG_FIELDS. Moves made here are recorded with the names as typed;
+    # refresh() back-fills everything else from the path structure. Each
+    # folder's mtime and subfolders are kept, so a rescan only lists folders
+    # whose contents changed (a file rewritten in place goes unnoticed).
+
+    def __init__(self, roots=None, db_path=None):
+        self.roots = roots or [VIDEO_BASE_DIR, PHOTO_BASE_DIR]
+        self.db = open_db(db_path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS catalog (path TEXT PRIMARY KEY, "
+            "dir TEXT NOT NULL, kind TEXT, loco_name TEXT, loco_number TEXT, "
+            "location TEXT, year INTEGER, month INTEGER, day INTEGER, "
+            "orientation TEXT, short_desc TEXT, size INTEGER, mtime INTEGER, "
+            "duration REAL, hash TEXT, source TEXT, sample TEXT)"
+        )
+        cols = {r[1] for r in self.db.execute("PRAGMA table_info(catalog)")}
+        if "sample" not in cols:
+            self.db.execute("ALTER TABLE catalog ADD COLUMN sample TEXT")
+        # LibraryIndex used to walk the library into a table of its own
+        self.db.execute("DROP TABLE IF EXISTS library_files")
+        for col in ("dir", "loco_number", "year", "location", "size"):
+            self.db.execute(
+                f"CREATE INDEX IF NOT EXISTS catalog_{col} ON catalog ({col})"
+            )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS catalog_dirs (path TEXT PRIMARY KEY, "
+            "mtime INTEGER NOT NULL, subdirs TEXT NOT NULL)"
+        )
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    def _facts(self, path, st, plan=None, digest=None):
+        facts = dict.fromkeys(CATALOG_FIELDS)
+        facts.update(parse_library_path(path) or {})
+        if plan:
+            facts.update({k: plan[k] for k in CATALOG_FIELDS if k in plan})
+        facts.update(path=path, size=st.st_size, source="sorted" if plan else "scan")
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            try:
+                # record() runs on the Tk thread right after a move: the probe
+                # made while planning has followed the file (rekey_probe), so
+                # only a back-fill from refresh() may start a new one
+                rec = cached_probe(path) if plan else probe_media(path)
+                facts["duration"] = rec["duration"] if rec else None
+                if rec and not facts["orientation"]:
+                    facts["orientation"] = media_orientation(rec)
+            except Exception:
+                pass
+        if digest:
+            facts["hash"] = f"{new_hasher()[0]}:{digest}"
+        return facts
+
+    def _store(self, rows):
+        # sample (and hash, unless the move hashed it) are left for
+        # LibraryIndex to fill in when a same-size inbox file turns up
+        cols = CATALOG_FIELDS + ["dir", "mtime", "sample"]
+        self.db.executemany(
+            f"INSERT OR REPLACE INTO catalog ({', '.join(cols)}) "
+            f"VALUES ({', '.join('?' * len(cols))})",
+            [[r.get(c) for c in cols] for r in rows],
+        )
+
+    def record(self, path, plan=None, digest=None):
+        # A file this sorter just placed; plan is the plan_move dict
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        facts = self._facts(path, st, plan, digest)
+        facts.update(dir=os.path.dirname(path), mtime=st.st_mtime_ns)
+        with self.lock:
+            self._store([facts])
+            self.db.commit()
+
+    @traced("Catalog.refresh")
+    def refresh(self, workers=PROBE_WORKERS):
+        started = time.time()
+        with self.lock:
+            known_dirs = {
+                p: (m, json.loads(sub))
+                for p, m, sub in self.db.execute(
+                    "SELECT path, mtime, subdirs FROM catalog_dirs"
+                )
+            }
+        seen, listed, offline = set(), [], []
+        for root in self.roots:
+            if not os.path.isdir(root):
+                offline.append(os.path.join(root, ""))
+                continue
+            stack = [root]
+            while stack:
+                d = stack.pop()
+                seen.add(d)
+                try:
+                    mtime = os.stat(d).st_mtime_ns
+                except OSError:
+                    continue
+                old = known_dirs.get(d)
+                if old and old[0] == mtime:
+                    stack.extend(old[1])
+                    continue
+                subdirs, files = [], {}
+                try:
+                    with os.scandir(d) as it:
+                        for e in it:
+                            if e.is_dir(follow_symlinks=False):
+                                if e.name not in LIBRARY_SKIP_DIRS:
+                                    subdirs.append(e.path)
+                            elif os.path.splitext(e.name)[1].lower() in (
+                                VIDEO_EXTENSIONS + IMAGE_EXTENSIONS
+                            ):
+                                files[e.path] = e.stat()
+                except OSError:
+                    continue
+                listed.append((d, mtime, subdirs, files))
+                stack.extend(subdirs)
+        gone = [
+            d
+            for d in known_dirs
+            if d not in seen and not any(d.startswith(o) for o in offline)
+        ]
+
+        todo, removed = [], []
+        with self.lock:
+            for d, _, _, files in listed:
+                for p, size, mtime in self.db.execute(
+                    "SELECT path, size, mtime FROM catalog WHERE dir = ?", (d,)
+                ).fetchall():
+                    st = files.get(p)
+                    if st is None:
+                        removed.append(p)
+                    elif (st.st_size, st.st_mtime_ns) == (size, mtime):
+                        del files[p]
+                todo.extend(files.items())
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(lambda item: self._facts(*item), todo))
+        for (p, st), facts in zip(todo, rows):
+            facts.update(dir=os.path.dirname(p), mtime=st.st_mtime_ns)
+        with self.lock:
+            self.db.executemany(
+                "DELETE FROM catalog WHERE path = ?", [(p,) for p in removed]
+            )
+            for table, col in (("catalog", "dir"), ("catalog_dirs", "path")):
+                self.db.executemany(
+                    f"DELETE FROM {table} WHERE {col} = ?", [(d,) for d in gone]
+                )
+            self._store(rows)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO catalog_dirs (path, mtime, subdirs) "
+                "VALUES (?, ?, ?)",
+                [(d, m, json.dumps(sub)) for d, m, sub, _ in listed],
+            )
+            self.db.commit()
+            total = self.db.execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
+        print(
+            f"[INFO] Catalog: {total} files, {len(rows)} new/changed, "
+            f"{len(removed)} removed, {len(listed)} of {len(seen)} folders listed "
+            f"in {time.time() - started:.1f} s"
+        )
+
+    def find(self, filters=None, count_by=None):
+        # filters: {field: value}, * and ? wildcards allowed; names and
+        # locations match with or without spaces. count_by gives
+        # [(value, files)] instead of rows.
+        where, args = [], []
+        for field, value in (filters or {}).items():
+            if field not in CATALOG_FIELDS:
+                raise ValueError(f"Unknown catalog field: {field}")
+            pattern = str(value).replace("%", r"\%").replace("_", r"\_")
+            pattern = pattern.replace("*", "%").replace("?", "_")
+            if field in CATALOG_TEXT_FIELDS:
+                where.append(
+                    f"REPLACE({field}, ' ', '') LIKE REPLACE(?, ' ', '') ESCAPE '\\'"
+                )
+            else:
+                where.append(f"{field} LIKE ? ESCAPE '\\'")
+            args.append(pattern)
+        cond = f" WHERE {' AND '.join(where)}" if where else ""
+        with self.lock:
+            if count_by:
+                if count_by not in CATALOG_FIELDS:
+                    raise ValueError(f"Unknown catalog field: {count_by}")
+                return self.db.execute(
+                    f"SELECT {count_by}, COUNT(*) FROM catalog{cond} "
+                    f"GROUP BY {count_by} ORDER BY {count_by}",
+                    args,
+                ).fetchall()
+            cur = self.db.execute(
+                f"SELECT {', '.join(CATALOG_FIELDS)} FROM catalog{cond} ORDER BY path",
+                args,
+            )
+            return [dict(zip(CATALOG_FIELDS, r)) for r in cur.fetchall()]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def dhash(img):
+    # 64-bit difference hash: 9x8 greyscale, one bit per left/right pair.
+    # Returned as a signed int so it fits SQLite and NumPy int64 as-is.
+    px = img.convert("L").resize((9, 8)).tobytes()
+    bits = 0
+    for row in range(0, 72, 9):
+        for col in range(row, row + 8):
+            bits = bits << 1 | (px[col] > px[col + 1])
+    return bits - (1 << 64) if bits >> 63 else bits
+
+
+class SimilarityIndex:
+    # Preview dHashes and capture times of inbox files, kept in DB_FILE keyed
+    # by size/mtime so reloading the inbox or a watch-mode regroup only
+    # hashes the new arrivals. Rows are dropped once a file is moved out.
+
+    def __init__(self, db_path=None):
+        self.db = open_db(db_path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS similar_hashes (path TEXT PRIMARY KEY, "
+            "size INTEGER NOT NULL, mtime INTEGER NOT NULL, percent INTEGER NOT NULL, "
+            "dhash INTEGER, captured REAL)"
+        )
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    def _fingerprint(self, path, percent):
+        img, _ = get_preview_image(path, percent)
+        cap = get_capture_datetime(path)
+        return dhash(img) if img else None, cap[0].timestamp() if cap else None
+
+    @traced("SimilarityIndex.fingerprints")
+    def fingerprints(self, files, percent, workers=PROBE_WORKERS):
+        # (dhash, captured) per file, in order; None where it can't be had
+        stats = {}
+        for f in files:
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            stats[f] = (st.st_size, st.st_mtime_ns, percent)
+        known = {}
+        with self.lock:
+            paths = list(stats)
+            for i in range(0, len(paths), 500):
+                chunk = paths[i : i + 500]
+                for p, size, mtime, pct, h, cap in self.db.execute(
+                    "SELECT path, size, mtime, percent, dhash, captured FROM similar_hashes "
+                    f"WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ):
+                    if stats[p] == (size, mtime, pct):
+                        known[p] = (h, cap)
+        todo = [f for f in stats if f not in known]
+        if todo:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                fresh = list(pool.map(lambda f: self._fingerprint(f, percent), todo))
+            known.update(zip(todo, fresh))
+            with self.lock:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO similar_hashes "
+                    "(path, size, mtime, percent, dhash, captured) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(f, *stats[f], *fp) for f, fp in zip(todo, fresh)],
+                )
+                self.db.commit()
+        return [known.get(f, (None, None)) for f in files]
+
+    def group(self, files, percent, workers=PROBE_WORKERS):
+        # Consecutive runs of similar files, e.g. [[a, b, c], [d], [e, f]]
+        fps = self.fingerprints(files, percent, workers)
+        ids = similar_group_ids([h for h, _ in fps], [t for _, t in fps])
+        groups = []
+        for f, gid in zip(files, ids):
+            if groups and gid == last:
+                groups[-1].append(f)
+            else:
+                groups.append([f])
+            last = gid
+        return groups
+
+    def forget(self, paths):
+        with self.lock:
+            self.db.executemany(
+                "DELETE FROM similar_hashes WHERE path = ?", [(p,) for p in paths]
+            )
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+@traced()
+def similar_group_ids(
+    hashes, times, max_bits=SIMILAR_MAX_BITS, gap=SIMILAR_GAP_S, window=SIMILAR_WINDOW
+):
+    # hashes/times are in inbox order (None = unknown). File m and m+k
+    # (k <= window) are linked when close in both hash and time; a group
+    # boundary goes wherever no link spans it. Returns a group id per file.
+    n = len(hashes)
+    np = _import_numpy()
+    if np is None:
+        covered = [False] * n
+        for k in range(1, window + 1):
+            for m in range(n - k):
+                a, b = hashes[m], hashes[m + k]
+                ta, tb = times[m], times[m + k]
+                if (
+                    a is not None
+                    and b is not None
+                    and ta is not None
+                    and tb is not None
+                    and abs(tb - ta) <= gap
+                    and bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1") <= max_bits
+                ):
+                    for j in range(m + 1, m + k + 1):
+                        covered[j] = True
+        ids, gid = [], 0
+        for c in covered:
+            gid += not c
+            ids.append(gid)
+        return ids
+    valid = np.array([h is not None and t is not None for h, t in zip(hashes, times)])
+    h = np.array([x or 0 for x in hashes], dtype=np.int64).view(np.uint64)
+    t = np.array([x or 0.0 for x in times], dtype=np.float64)
+    popcount = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    covered = np.zeros(n, dtype=bool)
+    for k in range(1, min(window, n - 1) + 1):
+        bits = popcount[(h[k:] ^ h[:-k]).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+        linked = (
+            (bits <= max_bits) & valid[k:] & valid[:-k] & (np.abs(t[k:] - t[:-k]) <= gap)
+        )
+        for j in range(1, k + 1):
+            covered[j : n - k + j] |= linked
+    return np.cumsum(~covered).tolist()
+
+
+def plan_move(
+    file_path,
+    loco_name,
+    loco_number,
+    location,
+    short_desc,
+    date=None,
+    index=None,
+    date_source="Manual",
+):
+    # Work out where one file goes. date is (year, month, day), or None to
+    # take it from the file. The name is reserved in index.
+    ext = os.path.splitext(file_path)[1].lower()
+    is_photo = ext in IMAGE_EXTENSIONS
+    if date is None:
+        rd = get_recorded_date(file_path)
+        if not rd:
+            raise ValueError(f"No date available for {file_path}")
+        date, date_source = rd[:3], rd[4]
+    year, month, day = date
+    orientation = None if is_photo else probe_video_orientation(file_path)
+    dest_dir = build_dest_path(
+        loco_name, loco_number, location, year, month, day, orientation, is_photo
+    )
+    dest_file, conflict = (index or DestIndex()).pick(
+        dest_dir, loco_number, year, location, short_desc, ext
+    )
+    return {
+        "src": file_path,
+        "dest_dir": dest_dir,
+        "dest_file": dest_file,
+        "conflict": conflict,
+        "loco_name": loco_name,
+        "loco_number": loco_number,
+        "location": location,
+        "short_desc": short_desc,
+        "year": year,
+        "month": month,
+        "day": day,
+        "date_source": date_source,
+        "orientation": orientation,
+        "is_photo": is_photo,
+    }
+
+
+def _plan_facts(file_path, date):
+    # Worker side of plan_batch: the date (if not given) and a warm probe
+    if date is not None:
+        if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+            probe_media(file_path)
+        return date, None
+    rd = get_recorded_date(file_path)
+    probe_media(file_path)
+    return (rd[:3], rd[4]) if rd else (None, None)
+
+
+@traced()
+def plan_batch(items, index=None, workers=PROBE_WORKERS):
+    # items: (file_path, loco_name, loco_number, location, short_desc, date,
+    # date_source) tuples. Every file is probed at once on a pool; names are
+    # then reserved in input order, so _1, _2... follow capture order. Returns
+    # (plans grouped by destination folder, [(file_path, error), ...]).
+    index = index or DestIndex()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        facts = list(pool.map(lambda it: _plan_facts(it[0], it[5]), items))
+    plans, failures = [], []
+    for (f, loco_name, loco_number, location, short_desc, date, source), (d, src) in zip(
+        items, facts
+    ):
+        if d is None:
+            failures.append((f, "no date available"))
+            continue
+        try:
+            plans.append(
+                plan_move(
+                    f, loco_name, loco_number, location, short_desc, d, index,
+                    src or source or "Manual",
+                )
+            )
+        except Exception as e:
+            failures.append((f, f"planning failed: {e}"))
+    first = {}
+    for i, p in enumerate(plans):
+        first.setdefault(p["dest_dir"], i)
+    plans.sort(key=lambda p: first[p["dest_dir"]])
+    return plans, failures
+
+
+PLAN_FIELDS = [
+    "src", "dest_dir", "dest_file", "conflict", "loco_name", "loco_number",
+    "location", "short_desc", "year", "month", "day", "date_source",
+    "orientation", "is_photo",
+]
+
+
+def export_plan(plans, path=None):
+    # Dry-run output: CSV, or JSON when the path ends in .json
+    path = path or PLAN_EXPORT_FILE
+    if path == "-":
+        fh = sys.stdout
+    else:
+        fh = open(path, "w", encoding="utf-8", newline="")
+    try:
+        if path.lower().endswith(".json"):
+            json.dump([{k: p[k] for k in PLAN_FIELDS} for p in plans], fh, indent=2)
+            fh.write("\n")
+        else:
+            w = csv.DictWriter(fh, fieldnames=PLAN_FIELDS, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(plans)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return path
+
+
+def inbox_excluded(name, exclude=None):
+    exclude = exclude if exclude is not None else INBOX_EXCLUDE
+    return any(fnmatch.fnmatch(name, pat) for pat in exclude)
+
+
+def inbox_wants(name, include=None):
+    include = include if include is not None else INBOX_INCLUDE
+    if include:
+        return any(fnmatch.fnmatch(name, pat) for pat in include)
+    return os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS + IMAGE_EXTENSIONS
+
+
+def scan_inbox(root, include=None, exclude=None, recursive=True):
+    # Walks the inbox (DCIM/100MEDIA-style subfolders included) and yields one
+    # list of (path, mtime, size) per folder as soon as it's read. The stat
+    # comes from the DirEntry, which Windows fills in for free.
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        found, subdirs = [], []
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if inbox_excluded(e.name, exclude):
+                        continue
+                    if e.is_dir():
+                        if recursive:
+                            subdirs.append(e.path)
+                        continue
+                    if not inbox_wants(e.name, include):
+                        continue
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    found.append((e.path, st.st_mtime, st.st_size))
+        except OSError as ex:
+            print(f"[WARNING] Could not scan {d}: {ex}")
+        if found:
+            found.sort(key=lambda x: (x[1], x[0]))
+            yield found
+        # Sorted so 100MEDIA comes before 101MEDIA
+        stack.extend(sorted(subdirs, reverse=True))
+
+
+def list_inbox(inbox, include=None, exclude=None):
+    # Whole inbox in mtime (≈ capture) order
+    found = [x for batch in scan_inbox(inbox, include, exclude) for x in batch]
+    return [path for path, _, _ in sorted(found, key=lambda x: (x[1], x[0]))]
+
+
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_Q_OVERFLOW, IN_ISDIR = 0x4000, 0x40000000
+INOTIFY_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+
+
+class InboxWatcher:
+    # Watches the inbox while cards are being copied in: inotify on Linux,
+    # scandir polling anywhere else (or if inotify can't be set up). A file
+    # is reported through on_ready(list of (path, mtime, size)) once its
+    # size and mtime have held still for WATCH_STABLE_S, and warm(path) then
+    # probes/thumbnails it on a small pool so it's ready before it's shown.
+
+    def __init__(self, root, on_ready, warm=None, include=None, exclude=None):
+        self.root = root
+        self.on_ready = on_ready
+        self.warm = warm
+        self.include = include
+        self.exclude = exclude
+        self.pending = {}
+        self.reported = set()
+        self.stop_event = threading.Event()
+        self.warm_pool = ThreadPoolExecutor(
+            max_workers=WATCH_WARM_WORKERS, thread_name_prefix="warm"
+        )
+        self.fd = None
+        self.watches = {}
+        self.thread = threading.Thread(target=self._run, name="inbox-watch", daemon=True)
+
+    def start(self):
+        if sys.platform.startswith("linux"):
+            try:
+                self._inotify_init()
+            except OSError as e:
+                print(f"[WARNING] inotify unavailable ({e}); polling the inbox instead")
+                self.fd = None
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.warm_pool.shutdown(wait=False)
+
+    @property
+    def backend(self):
+        return "inotify" if self.fd is not None else "polling"
+
+    def _inotify_init(self):
+        import ctypes, ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+        self._add_watch(self.root)
+
+    def _add_watch(self, d):
+        import ctypes
+
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(d), INOTIFY_MASK)
+        if wd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, f"inotify_add_watch failed for {d}: {os.strerror(e)}")
+        self.watches[wd] = d
+
+    def _note(self, path, now):
+        # (Re)start the stability clock for a file
+        if path in self.reported:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.pending.pop(path, None)
+            return
+        sig = (st.st_size, st.st_mtime_ns)
+        old = self.pending.get(path)
+        if old is None or old[0] != sig:
+            # Files that already sat still before we looked don't need to wait
+            since = now if now - st.st_mtime < WATCH_STABLE_S else now - WATCH_STABLE_S
+            self.pending[path] = (sig, since if old is None else now)
+
+    def _scan(self, now):
+        # Full walk: the polling backend every WATCH_POLL_S, inotify once at
+        # start and after a queue overflow (adding watches for new folders)
+        seen = set()
+        for found in scan_inbox(self.root, self.include, self.exclude):
+            for path, _, _ in found:
+                seen.add(path)
+                self._note(path, now)
+        if self.fd is not None:
+            known = set(self.watches.values())
+            stack = [self.root]
+            while stack:
+                d = stack.pop()
+                if d not in known:
+                    try:
+                        self._add_watch(d)
+                    except OSError as e:
+                        print(f"[WARNING] {e}")
+                try:
+                    with os.scandir(d) as it:
+                        stack.extend(
+                            e.path
+                            for e in it
+                            if e.is_dir() and not inbox_excluded(e.name, self.exclude)
+                        )
+                except OSError:
+                    pass
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+        # Sorted out of the inbox: the next card may reuse the name
+        self.reported &= seen
+
+    def _read_events(self, timeout):
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if not r:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        now = time.time()
+        off = 0
+        while off + 16 <= len(data):
+            wd, mask, _, n = struct.unpack_from("iIII", data, off)
+            name = os.fsdecode(data[off + 16 : off + 16 + n].rstrip(b"\0"))
+            off += 16 + n
+            if mask & IN_Q_OVERFLOW:
+                self._scan(now)
+                continue
+            d = self.watches.get(wd)
+            if d is None or not name:
+                continue
+            path = os.path.join(d, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not inbox_excluded(name, self.exclude):
+                    # A new card folder: watch it, and pick up whatever
+                    # landed in it before the watch existed
+                    self._scan(now)
+                continue
+            if not inbox_wants(name, self.include) or inbox_excluded(name, self.exclude):
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self.pending.pop(path, None)
+                self.reported.discard(path)
+            else:
+                self._note(path, now)
+
+    def _settle(self, now):
+        ready = []
+        for path, (sig, since) in list(self.pending.items()):
+            if now - since < WATCH_STABLE_S:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != sig:
+                self.pending[path] = ((st.st_size, st.st_mtime_ns), now)
+                continue
+            if not st.st_size:
+                continue
+            del self.pending[path]
+            self.reported.add(path)
+            ready.append((path, st.st_mtime, st.st_size))
+        if ready:
+            ready.sort(key=lambda x: (x[1], x[0]))
+            self.on_ready(ready)
+            if self.warm:
+                for path, _, _ in ready:
+                    self.warm_pool.submit(self._warm, path)
+
+    def _warm(self, path):
+        try:
+            self.warm(path)
+        except Exception as e:
+            print(f"[WARNING] Could not pre-probe {path}: {e}")
+
+    def _run(self):
+        self._scan(time.time())
+        last_scan = time.time()
+        try:
+            while not self.stop_event.is_set():
+                if self.fd is not None:
+                    self._read_events(0.5)
+                else:
+                    self.stop_event.wait(0.5)
+                    if time.time() - last_scan >= WATCH_POLL_S:
+                        self._scan(time.time())
+                        last_scan = time.time()
+                self._settle(time.time())
+        finally:
+            if self.fd is not None:
+                os.close(self.fd)
+
+
+def load_manifest(path):
+    # CSV with a header row, or JSON (a list, or {"rules": [...]}). Columns:
+    # pattern, start, end, loco_name, loco_number, location, short_desc.
+    # pattern is a filename glob; start/end an ISO capture-time range.
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        rows = data["rules"] if isinstance(data, dict) else data
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as fh:
+            rows = list(csv.DictReader(fh))
+    rules = []
+    for i, row in enumerate(rows, 1):
+        row = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        missing = [k for k in ("loco_name", "loco_number", "location") if not row.get(k)]
+        if missing:
+            raise ValueError(f"Manifest rule {i} is missing {', '.join(missing)}")
+        rules.append(
+            {
+                "pattern": (row.get("pattern") or "*").lower(),
+                "start": datetime.fromisoformat(row["start"]) if row.get("start") else None,
+                "end": datetime.fromisoformat(row["end"]) if row.get("end") else None,
+                "loco_name": row["loco_name"],
+                "loco_number": str(row["loco_number"]),
+                "location": row["location"],
+                "short_desc": row.get("short_desc") or "",
+            }
+        )
+    return rules
+
+
+def match_rule(rules, file_path, captured):
+    # First rule whose glob and time range both fit wins
+    name = os.path.basename(file_path).lower()
+    if captured is not None and captured.tzinfo is not None:
+        captured = captured.astimezone().replace(tzinfo=None)
+    for rule in rules:
+        if not fnmatch.fnmatch(name, rule["pattern"]):
+            continue
+        if rule["start"] or rule["end"]:
+            if captured is None:
+                continue
+            if rule["start"] and captured < rule["start"]:
+                continue
+            if rule["end"] and captured > rule["end"]:
+                continue
+        return rule
+    return None
+
+
+def run_batch(
+    inbox,
+    manifest_path,
+    dry_run=False,
+    workers=PROBE_WORKERS,
+    skip_duplicates=False,
+    include=None,
+    exclude=None,
+    plan_out=None,
+    proxies=PROXY_ENABLED,
+):
+    started = time.time()
+    rules = load_manifest(manifest_path)
+    journal = redo = None
+    if not dry_run:
+        # Finish whatever an interrupted run left behind before looking at the
+        # inbox, so those files aren't planned a second time
+        journal = MoveJournal()
+        redo = recover_moves(journal)
+        journal.compact()
+        if redo:
+            print(f"[INFO] Resuming {len(redo)} unfinished moves from the journal")
+    resumed = {e["src"] for e in redo or []}
+    files = [f for f in list_inbox(inbox, include, exclude) if f not in resumed]
+    print(f"[INFO] {len(files)} files in {inbox}, {len(rules)} manifest rules")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        captures = list(pool.map(get_capture_datetime, files))
+    catalog = Catalog()
+    library = LibraryIndex(catalog)
+    library.refresh()
+
+    items, unmatched, duplicates = [], [], []
+    for f, cap in zip(files, captures):
+        rule = match_rule(rules, f, cap[0] if cap else None)
+        if not rule:
+            unmatched.append(f)
+            continue
+        dup = library.find_duplicate(f)
+        if dup:
+            duplicates.append((f, dup))
+            if skip_duplicates:
+                continue
+        else:
+            library.claim(f)
+        items.append(
+            (
+                f,
+                rule["loco_name"],
+                rule["loco_number"],
+                rule["location"],
+                rule["short_desc"],
+                (cap[0].year, cap[0].month, cap[0].day) if cap else None,
+                cap[2] if cap else None,
+            )
+        )
+    index = DestIndex()
+    for e in redo or []:
+        index.claim(e["dest"])
+    plans, failures = plan_batch(items, index, workers)
+    if not dry_run:
+        get_data_store().remember(
+            (p["loco_name"], p["loco_number"], p["location"]) for p in plans
+        )
+    print(f"[INFO] Planned {len(plans)} moves in {time.time() - started:.1f} s")
+
+    moved, total_bytes = 0, 0
+    if dry_run:
+        out = export_plan(plans, plan_out)
+        if out != "-":
+            print(f"[DryRun] Plan for {len(plans)} files written to {out}")
+    else:
+        proxy_queue = ProxyQueue() if proxies else None
+        if proxy_queue:
+            proxy_queue.resume()
+        by_dest = {p["dest_file"]: p for p in plans}
+        transfers = TransferQueue(journal=journal)
+        for e in redo:
+            by_dest[e["dest"]] = e.get("plan")
+        transfers.submit_many(
+            [(e["src"], e["dest"], e.get("plan")) for e in redo]
+            + [(p["src"], p["dest_file"], p) for p in plans]
+        )
+        transfers.wait(
+            lambda snap: print(
+                f"[PROGRESS] {snap['done'] / 1e9:.2f} of {snap['total'] / 1e9:.2f} GB, "
+                f"{snap['rate'] / 1e6:.1f} MB/s"
+            ),
+            interval=10,
+        )
+        for job in transfers.pop_finished():
+            if job.status == "moved":
+                moved += 1
+                total_bytes += job.size
+                catalog.record(job.dest, by_dest.get(job.dest), job.digest)
+                if proxy_queue:
+                    proxy_queue.submit(job.dest)
+            else:
+                failures.append((job.src, f"{job.status}: {job.message}"))
+        transfers.shutdown()
+        journal.close()
+        if proxy_queue:
+            # Interrupting here is fine: unfinished proxies resume next run
+            proxy_queue.wait(
+                lambda n: print(f"[PROGRESS] {n} proxies to go"), interval=30
+            )
+            print(
+                f"[INFO] Proxies: {proxy_queue.made} written, {proxy_queue.failed} failed"
+            )
+
+    elapsed = time.time() - started
+    print(
+        f"[SUMMARY] {len(files)} files: {moved} moved, {len(failures)} failed, "
+        f"{len(unmatched)} unmatched, {len(duplicates)} duplicates"
+        f"{' skipped' if skip_duplicates else ''}{' (dry run)' if dry_run else ''} | "
+        f"{total_bytes / 1e9:.2f} GB in {elapsed:.1f} s "
+        f"({total_bytes / 1e6 / elapsed if elapsed else 0:.1f} MB/s, "
+        f"{moved / elapsed if elapsed else 0:.2f} files/s)"
+    )
+    for f, why in failures:
+        print(f"[FAILED] {f}: {why}")
+    for f in unmatched:
+        print(f"[UNMATCHED] {f}")
+    for f, dup in duplicates:
+        print(f"[DUPLICATE] {f} matches {dup}")
+    catalog.close()
+    return 1 if failures else 0
+
+
+def run_catalog(finds=None, count_by=None):
+    catalog = Catalog()
+    catalog.refresh()
+    filters = {}
+    for f in finds or []:
+        field, sep, value = f.partition("=")
+        if not sep:
+            raise SystemExit(f"[ERROR] --find wants FIELD=VALUE, got {f!r}")
+        filters[field.strip()] = value.strip()
+    try:
+        if count_by:
+            for value, n in catalog.find(filters, count_by):
+                print(f"{n:8d}  {value}")
+        elif filters:
+            rows = catalog.find(filters)
+            for r in rows:
+                print(r["path"])
+            size = sum(r["size"] or 0 for r in rows)
+            print(f"[SUMMARY] {len(rows)} files, {size / 1e9:.2f} GB")
+    except ValueError as e:
+        raise SystemExit(f"[ERROR] {e} (fields: {', '.join(CATALOG_FIELDS)})")
+    finally:
+        catalog.close()
+    return 0
+
+
+def run_groups(inbox, percent=70, workers=PROBE_WORKERS, include=None, exclude=None):
+    started = time.time()
+    files = list_inbox(inbox, include, exclude)
+    index = SimilarityIndex()
+    groups = index.group(files, percent, workers)
+    index.close()
+    bursts = [g for g in groups if len(g) > 1]
+    for g in bursts:
+        print(
+            f"[GROUP] {len(g)} files: "
+            f"{os.path.basename(g[0])} .. {os.path.basename(g[-1])}"
+        )
+    print(
+        f"[SUMMARY] {len(files)} files in {len(groups)} groups, "
+        f"{sum(map(len, bursts))} in {len(bursts)} bursts, {time.time() - started:.1f} s"
+    )
+    return 0
+
+
+class GalaSorter:
+
+    def on_loco_name_selected(self, event=None):
+        number = data_store.number_for(self.loco_name_var.get())
+        if number is not None:
+            self.loco_number_var.set(number)
+
+    def on_loco_number_selected(self, event=None):
+        name = data_store.name_for(self.loco_number_var.get())
+        if name is not None:
+            self.loco_name_var.set(name)
+
+    def filter_combobox(self, cb, index, event=None):
+        # Type-ahead: the dropdown only ever holds the best matches so far
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        cb.config(values=index.complete(cb.get()))
+
+    def handle_non_date_change(self, *args):
+        # Just refresh the info without overriding the date source tag
+        self.schedule_meta_update()
+
+    def handle_date_change(self, *args):
+        if not self.setting_dates:
+            self.date_source = "Manual"
+        self.schedule_meta_update()
+
+    def schedule_meta_update(self):
+        if self.meta_after_id is not None:
+            self.master.after_cancel(self.meta_after_id)
+        self.meta_after_id = self.master.after(META_DEBOUNCE_MS, self.update_meta_info)
+
+    def __init__(self, master):
+        self.master = master
+        master.title("Gala Mode Video Sorter")
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.file_list = []
+        self.file_index = 0
+        self.file_mtimes = {}
+        self.live_files = set()
+        self.scan_queue = queue.SimpleQueue()
+        self.scan_generation = 0
+        self.scanning = False
+        self.scan_poll_id = None
+        self.watcher = None
+        self.watch_var = tk.BooleanVar(value=False)
+        self.inbox_var = tk.StringVar(value=DEFAULT_INBOX)
+        self.loco_name_var = tk.StringVar()
+        self.loco_number_var = tk.StringVar()
+        self.location_var = tk.StringVar()
+        self.short_desc_var = tk.StringVar()
+        self.year_var = tk.IntVar()
+        self.month_var = tk.IntVar()
+        self.day_var = tk.IntVar()
+        self.same_loco_var = tk.BooleanVar(value=False)
+        self.apply_next_var = tk.IntVar(value=1)
+        self.dry_run_var = tk.BooleanVar(value=False)
+        self.proxy_var = tk.BooleanVar(value=PROXY_ENABLED)
+        self.proxies = ProxyQueue()
+        self.proxies_resumed = False
+        self.toggle_proxies()
+        self.preview_percent_var = tk.IntVar(value=70)
+        self.prefetch_ahead_var = tk.IntVar(value=PREFETCH_AHEAD)
+        self.filmstrip_var = tk.BooleanVar(value=False)
+        self.current_strip = []
+        self.prefetch_pool = ThreadPoolExecutor(
+            max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch"
+        )
+        self.prefetch_futures = {}
+        self.prefetched = {}
+        self.prefetch_poll_id = None
+        self.loading_file = None
+        self.loading_regen = False
+        self.date_source = "Manual"
+        self.setting_dates = False
+        self.meta_after_id = None
+        self.file_facts = None
+        self.dest_index = DestIndex()
+        self.journal = MoveJournal()
+        self.transfers = TransferQueue(journal=self.journal)
+        self.catalog = Catalog()
+        self.library = LibraryIndex(self.catalog)
+        self.duplicate_of = None
+        self.duplicate_rechecks = {}
+        threading.Thread(target=self.library.refresh, daemon=True).start()
+        master.after(SCAN_POLL_MS, self.poll_library)
+        self.similar = SimilarityIndex()
+        self.catalog_plans = {}
+        self.group_of = {}
+        self.group_queue = queue.SimpleQueue()
+        self.grouping = False
+        self.groups_dirty = False
+        self.transfer_poll_id = None
+        self.transfer_errors = []
+        master.after(0, self.resume_moves)
+        tk.Label(master, text="Inbox Folder:").grid(row=0, column=0, sticky="w")
+        tk.Entry(master, textvariable=self.inbox_var, width=60).grid(row=0, column=1)
+        tk.Button(master, text="Browse", command=self.browse_folder).grid(
+            row=0, column=2
+        )
+        tk.Label(master, text="Loco Name:").grid(row=1, column=0, sticky="w")
+        self.name_index = CompletionIndex(data_store.usage("name"))
+        self.number_index = CompletionIndex(data_store.usage("number"))
+        self.location_index = CompletionIndex(data_store.usage("location"))
+        self.loco_name_cb = ttk.Combobox(master, textvariable=self.loco_name_var)
+        self.loco_name_cb.bind("<<ComboboxSelected>>", self.on_loco_name_selected)
+        self.loco_name_cb.grid(row=1, column=1, sticky="w")
+        tk.Label(master, text="Loco Number:").grid(row=2, column=0, sticky="w")
+        self.loco_number_cb = ttk.Combobox(master, textvariable=self.loco_number_var)
+        self.loco_number_cb.bind("<<ComboboxSelected>>", self.on_loco_number_selected)
+        self.loco_number_cb.grid(row=2, column=1, sticky="w")
+        tk.Label(master, text="Location/Event:").grid(row=3, column=0, sticky="w")
+        self.location_cb = ttk.Combobox(master, textvariable=self.location_var)
+        self.location_cb.grid(row=3, column=1, sticky="w")
+        for cb, index in (
+            (self.loco_name_cb, self.name_index),
+            (self.loco_number_cb, self.number_index),
+            (self.location_cb, self.location_index),
+        ):
+            cb.config(postcommand=lambda cb=cb, index=index: self.filter_combobox(cb, index))
+            cb.bind("<KeyRelease>", lambda e, cb=cb, index=index: self.filter_combobox(cb, index, e))
+        tk.Label(master, text="Short Description:").grid(row=4, column=0, sticky="w")
+        tk.Entry(master, textvariable=self.short_desc_var, width=40).grid(
+            row=4, column=1, sticky="w"
+        )
+        tk.Label(master, text="Year:").grid(row=5, column=0, sticky="w")
+        self.year_entry = tk.Entry(master, textvariable=self.year_var, width=6)
+        self.year_entry.grid(row=5, column=1, sticky="w")
+        tk.Label(master, text="Month:").grid(row=6, column=0, sticky="w")
+        self.month_entry = tk.Entry(master, textvariable=self.month_var, width=4)
+        self.month_entry.grid(row=6, column=1, sticky="w")
+        tk.Label(master, text="Day:").grid(row=7, column=0, sticky="w")
+        self.day_entry = tk.Entry(master, textvariable=self.day_var, width=4)
+        self.day_entry.grid(row=7, column=1, sticky="w")
+        tk.Checkbutton(
+            master, text="All files same loco/location", variable=self.same_loco_var
+        ).grid(row=8, column=1, sticky="w")
+        tk.Label(master, text="Apply to next N files:").grid(
+            row=9, column=0, sticky="w"
+        )
+        tk.Entry(master, textvariable=self.apply_next_var, width=5).grid(
+            row=9, column=1, sticky="w"
+        )
+        self.burst_button = tk.Button(
+            master, text="Apply to similar", state="disabled", command=self.process_burst
+        )
+        self.burst_button.grid(row=9, column=2, sticky="w")
+        tk.Checkbutton(master, text="Dry Run", variable=self.dry_run_var).grid(
+            row=10, column=1, sticky="w"
+        )
+        tk.Checkbutton(
+            master,
+            text="Make proxies",
+            variable=self.proxy_var,
+            command=self.toggle_proxies,
+        ).grid(row=10, column=0, sticky="w")
+        prefetch_frame = tk.Frame(master)
+        prefetch_frame.grid(row=10, column=2, sticky="w")
+        tk.Label(prefetch_frame, text="Look-ahead:").pack(side="left")
+        tk.Spinbox(
+            prefetch_frame,
+            from_=0,
+            to=20,
+            textvariable=self.prefetch_ahead_var,
+            width=3,
+            command=self.schedule_prefetch,
+        ).pack(side="left")
+        self.preview_label = tk.Label(master)
+        self.preview_label.grid(row=0, column=3, rowspan=8, padx=10, pady=10)
+        self.timestamp_label = tk.Label(master, text="")
+        self.timestamp_label.grid(row=8, column=3, pady=(0, 5))
+        tk.Label(master, text="Preview %:").grid(row=9, column=3, sticky="w")
+        tk.Spinbox(
+            master,
+            from_=1,
+            to=99,
+            textvariable=self.preview_percent_var,
+            width=5,
+            command=self.on_preview_percent_change,
+        ).grid(row=9, column=3, sticky="e")
+        regen_frame = tk.Frame(master)
+        regen_frame.grid(row=10, column=3)
+        tk.Button(
+            regen_frame,
+            text="Regenerate Preview",
+            command=lambda: self.show_current_file(regen=True),
+        ).pack(side="left")
+        tk.Checkbutton(
+            regen_frame,
+            text="Filmstrip",
+            variable=self.filmstrip_var,
+            command=self.toggle_filmstrip,
+        ).pack(side="left")
+        self.filmstrip_label = tk.Label(master)
+        self.filmstrip_label.grid(row=11, column=3)
+        load_frame = tk.Frame(master)
+        load_frame.grid(row=11, column=0)
+        tk.Button(load_frame, text="Load Files", command=self.load_files).pack(side="left")
+        tk.Checkbutton(
+            load_frame, text="Watch", variable=self.watch_var, command=self.toggle_watch
+        ).pack(side="left")
+        tk.Button(master, text="Process Next", command=self.process_next).grid(
+            row=11, column=1
+        )
+        tk.Button(master, text="Skip", command=self.skip_file).grid(row=11, column=2)
+        self.progress_label = tk.Label(master, text="No files loaded")
+        self.progress_label.grid(row=12, column=0, columnspan=4)
+        self.meta_text = tk.Text(
+            master, height=8, wrap="none", state="disabled", font=("Courier New", 9)
+        )
+        self.meta_text.grid(row=13, column=0, columnspan=4, sticky="nsew")
+        self.meta_text.tag_config("folder_exists", foreground="green")
+        self.meta_text.tag_config("folder_missing", foreground="red")
+        self.meta_text.tag_config("file_ok", foreground="green")
+        self.meta_text.tag_config("file_conflict", foreground="orange", font=("Courier New", 9, "bold"))
+        self.meta_text.tag_config("meta_source", foreground="green")
+        self.meta_text.tag_config("modified_source", foreground="orange")
+        self.meta_text.tag_config("manual_source", foreground="grey")
+        self.meta_text.tag_config("duplicate", foreground="red", font=("Courier New", 9, "bold"))
+        self.copy_path_btn = tk.Button(
+            master, text="Copy Destination Path", command=self.copy_dest_path
+        )
+        self.copy_path_btn.grid(row=14, column=0)
+        self.copy_file_btn = tk.Button(
+            master, text="Copy Destination File", command=self.copy_dest_file
+        )
+        self.copy_file_btn.grid(row=14, column=1)
+        self.stats_label = tk.Label(master, text="", fg="grey")
+        self.stats_label.grid(row=15, column=0, columnspan=4, sticky="w")
+        if tracer.enabled:
+            self.trace_label = tk.Label(master, text="", fg="grey")
+            self.trace_label.grid(row=18, column=0, columnspan=4, sticky="w")
+            self.update_trace_stats()
+        self.transfer_bar = ttk.Progressbar(master, length=400, mode="determinate")
+        self.transfer_bar.grid(row=16, column=0, columnspan=2, sticky="w")
+        self.transfer_label = tk.Label(master, text="", justify="left")
+        self.transfer_label.grid(row=17, column=0, columnspan=4, sticky="w")
+        # Date fields – these changes mean manual override
+        for v in [self.year_var, self.month_var, self.day_var]:
+            v.trace_add("write", self.handle_date_change)
+
+        # Other fields – don’t change the date source
+        for v in [self.loco_name_var, self.loco_number_var, self.location_var, self.short_desc_var]:
+            v.trace_add("write", self.handle_non_date_change)
+
+    def on_close(self):
+        snap = self.transfers.snapshot()
+        if (snap["active"] or snap["queued"]) and not messagebox.askyesno(
+            "Transfers running",
+            "Files are still being moved. Quit once the current copies finish?",
+        ):
+            return
+        self.stop_watching()
+        self.proxies.shutdown()
+        self.transfers.shutdown()
+        self.cancel_prefetch()
+        self.prefetch_pool.shutdown(wait=False)
+        self.master.destroy()
+
+    def update_trace_stats(self):
+        self.trace_label.config(text=tracer.summary_text())
+        self.master.after(TRACE_STATS_MS, self.update_trace_stats)
+
+    def browse_folder(self):
+        s = filedialog.askdirectory()
+        self.inbox_var.set(s) if s else None
+
+    def clear_fields(self):
+        self.loco_name_var.set("")
+        self.loco_number_var.set("")
+        self.location_var.set("")
+        self.short_desc_var.set("")
+        self.year_var.set(0)
+        self.month_var.set(0)
+        self.day_var.set(0)
+
+    def load_files(self):
+        p = self.inbox_var.get()
+        if not os.path.isdir(p):
+            return messagebox.showerror("Error", f"Inbox not found: {p}")
+        # The scan runs on its own thread and hands over one folder at a time;
+        # the first file is shown as soon as it turns up
+        self.stop_watching()
+        self.scan_generation += 1
+        self.file_list = []
+        self.file_mtimes = {}
+        self.live_files = set()
+        self.file_index = 0
+        self.group_of = {}
+        self.cancel_prefetch()
+        self.dest_index.forget()
+        self.clear_fields()
+        self.scanning = True
+        self.progress_label.config(text="Scanning inbox...")
+        if self.watch_var.get():
+            self.start_watching(p, self.scan_generation)
+        else:
+            threading.Thread(
+                target=self.scan_worker, args=(p, self.scan_generation), daemon=True
+            ).start()
+        if self.scan_poll_id is None:
+            self.scan_poll_id = self.master.after(SCAN_POLL_MS, self.poll_scan)
+
+    def scan_worker(self, inbox, generation):
+        # Worker thread: no Tk calls, just feed the queue
+        try:
+            for found in scan_inbox(inbox):
+                if generation != self.scan_generation:
+                    return
+                self.scan_queue.put((generation, found, False))
+        finally:
+            self.scan_queue.put((generation, None, False))
+
+    def start_watching(self, inbox, generation):
+        # Watch mode: the scan never "finishes"; files are handed over as they
+        # finish copying and are probed/thumbnailed before they're reached
+        warm = functools.partial(
+            prefetch_file,
+            percent=self.preview_percent_var.get(),
+            filmstrip=self.filmstrip_var.get(),
+            library=self.library,
+        )
+        self.watcher = InboxWatcher(
+            inbox,
+            lambda ready: self.scan_queue.put((generation, ready, True)),
+            warm=warm,
+        ).start()
+        print(f"[INFO] Watching {inbox} for new files ({self.watcher.backend})")
+
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+            self.scan_queue.put((self.scan_generation, None, True))
+
+    def toggle_proxies(self):
+        # Jobs an earlier session left unfinished only start once proxies
+        # are switched on, not on every launch
+        if self.proxy_var.get() and not self.proxies_resumed:
+            self.proxies_resumed = True
+            threading.Thread(target=self.proxies.resume, daemon=True).start()
+
+    def toggle_watch(self):
+        if not self.watch_var.get():
+            return self.stop_watching()
+        if not self.file_list:
+            return self.load_files()
+        # Already sorting: keep our place and just start adding new arrivals
+        # (files already in the list are ignored by poll_scan)
+        if not os.path.isdir(self.inbox_var.get()) or self.watcher:
+            return
+        self.scanning = True
+        self.start_watching(self.inbox_var.get(), self.scan_generation)
+        if self.scan_poll_id is None:
+            self.scan_poll_id = self.master.after(SCAN_POLL_MS, self.poll_scan)
+
+    def poll_scan(self):
+        self.scan_poll_id = None
+        waiting = self.file_index >= len(self.file_list)
+        pending = self.transfers.pending_sources()
+        added = finished = resort = False
+        while True:
+            try:
+                generation, found, live = self.scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.scan_generation:
+                continue
+            if found is None:
+                self.scanning = self.watcher is not None
+                finished = True
+                continue
+            fresh = {
+                path: mtime
+                for path, mtime, _ in found
+                if path not in pending and path not in self.file_mtimes
+            }
+            # Watcher arrivals go on the end, so nothing new slips in between
+            # the current file and the rest of what's already listed
+            for path in sorted(fresh, key=lambda f: (fresh[f], f)):
+                self.file_mtimes[path] = fresh[path]
+                self.file_list.append(path)
+                if live:
+                    self.live_files.add(path)
+            added = added or bool(fresh)
+            resort = resort or bool(fresh) and not live
+        if resort:
+            # The initial scan comes a folder at a time: keep what it found
+            # after the current file in mtime order, watcher arrivals last
+            def order(f):
+                return (1,) if f in self.live_files else (0, self.file_mtimes[f], f)
+
+            keep = self.file_index + (0 if waiting else 1)
+            self.file_list[keep:] = sorted(self.file_list[keep:], key=order)
+        if waiting and (added or not self.scanning):
+            if not self.file_list and not self.watcher:
+                self.progress_label.config(text="")
+                messagebox.showinfo("Info", "No supported files found.")
+            else:
+                self.show_current_file()
+        elif added or not self.scanning:
+            if not self.loading_file:
+                self.progress_label.config(text=self.progress_text())
+            self.schedule_prefetch()
+        if self.file_list and (finished or (added and self.watcher)):
+            self.request_grouping()
+        if self.scanning:
+            self.scan_poll_id = self.master.after(SCAN_POLL_MS, self.poll_scan)
+
+    def request_grouping(self):
+        # Bursts are worked out off the Tk thread once the list is known;
+        # files that turn up meanwhile (watch mode) trigger one more pass
+        if self.grouping:
+            self.groups_dirty = True
+            return
+        self.grouping = True
+        self.groups_dirty = False
+        threading.Thread(
+            target=self.group_worker,
+            args=(
+                self.file_list[self.file_index :],
+                self.preview_percent_var.get(),
+                self.scan_generation,
+            ),
+            daemon=True,
+        ).start()
+        self.master.after(SCAN_POLL_MS, self.poll_groups)
+
+    def group_worker(self, files, percent, generation):
+        try:
+            groups = self.similar.group(files, percent)
+        except Exception as e:
+            print(f"[WARNING] Burst grouping failed: {e}")
+            groups = []
+        self.group_queue.put((generation, groups))
+
+    def poll_groups(self):
+        try:
+            generation, groups = self.group_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(SCAN_POLL_MS, self.poll_groups)
+            return
+        self.grouping = False
+        if generation == self.scan_generation:
+            self.group_of = {f: i for i, g in enumerate(groups) for f in g}
+            if not self.loading_file and self.file_index < len(self.file_list):
+                self.update_burst_button()
+                self.progress_label.config(text=self.progress_text())
+        if self.groups_dirty:
+            self.request_grouping()
+
+    def similar_run(self):
+        # How many files from the current one on belong to its burst
+        i = self.file_index
+        gid = self.group_of.get(self.file_list[i]) if i < len(self.file_list) else None
+        if gid is None:
+            return 1
+        n = 1
+        files = self.file_list
+        while i + n < len(files) and self.group_of.get(files[i + n]) == gid:
+            n += 1
+        return n
+
+    def update_burst_button(self):
+        # Offer the rest of the burst; N in the entry is only ever the user's
+        run = self.similar_run()
+        self.burst_button.config(
+            text=f"Apply to {run} similar" if run > 1 else "Apply to similar",
+            state="normal" if run > 1 else "disabled",
+        )
+
+    def process_burst(self):
+        self.process_next(self.similar_run())
+
+    def progress_text(self):
+        text = f"File {self.file_index+1} of {len(self.file_list)}"
+        run = self.similar_run()
+        if run > 1:
+            text += f" | {run} similar shots"
+        if self.watcher:
+            return text + " (watching...)"
+        return text + " (scanning...)" if self.scanning else text
+
+    def show_current_file(self, regen=False):
+        if self.file_index >= len(self.file_list):
+            if self.scanning:
+                # poll_scan calls back in once the scan finds more
+                self.progress_label.config(
+                    text="Waiting for new files..." if self.watcher else "Scanning inbox..."
+                )
+                return
+            return messagebox.showinfo("Done", "All files processed.")
+        f = self.file_list[self.file_index]
+        res = self.prefetched.get(f)
+        stale = res and (
+            res["filmstrip"] != self.filmstrip_var.get()
+            or (not res["strip"] and res["percent"] != self.preview_percent_var.get())
+        )
+        if regen or stale:
+            self.prefetched.pop(f, None)
+            fut = self.prefetch_futures.pop(f, None)
+            if fut:
+                fut.cancel()
+            res = None
+        self.schedule_prefetch()
+        if res is None:
+            # Not ready yet - poll_prefetch calls back in when the worker is done
+            self.loading_file = f
+            self.loading_regen = regen
+            self.year_entry.config(state="disabled")
+            self.month_entry.config(state="disabled")
+            self.day_entry.config(state="disabled")
+            self.preview_label.configure(image="", text="Loading preview...")
+            self.preview_label.image = None
+            self.timestamp_label.config(text="")
+            self.filmstrip_label.configure(image="")
+            self.filmstrip_label.image = None
+            self.current_strip = []
+            if not regen:
+                self.progress_label.config(text=self.progress_text() + " (loading...)")
+            return
+        self.loading_file = None
+        rd = res["date"]
+        self.setting_dates = True
+        if rd:
+            y, m, d, locked, src = rd
+            self.year_var.set(y)
+            self.month_var.set(m)
+            self.day_var.set(d)
+            st = "disabled" if locked else "normal"
+        else:
+            self.year_var.set("")
+            self.month_var.set("")
+            self.day_var.set("")
+            st = "normal"
+            src = "Manual"
+        self.setting_dates = False
+        self.date_source = src
+        self.file_facts = self.load_file_facts(f)
+        self.duplicate_of = res["duplicate"]
+        self.year_entry.config(state=st)
+        self.month_entry.config(state=st)
+        self.day_entry.config(state=st)
+        self.current_strip = res["strip"]
+        if res["strip"]:
+            _, img, ts = nearest_strip_frame(res["strip"], self.preview_percent_var.get())
+            strip_img = ImageTk.PhotoImage(make_filmstrip_image(res["strip"]))
+        else:
+            img, ts = res["image"], res["ts"]
+            strip_img = None
+        self.filmstrip_label.configure(image=strip_img or "")
+        self.filmstrip_label.image = strip_img
+        p = ImageTk.PhotoImage(img) if img else None
+        (
+            self.preview_label.configure(image=p)
+            if p
+            else self.preview_label.configure(image="", text="No preview")
+        )
+        self.preview_label.image = p
+        self.timestamp_label.config(text=f"Preview at: {ts}" if ts else "")
+        self.stats_label.config(text=thumb_cache.stats_text())
+        if not regen:
+            self.update_burst_button()
+            self.progress_label.config(text=self.progress_text())
+        self.update_meta_info()
+
+    def schedule_prefetch(self):
+        # Keep workers busy on the current file plus the next N; anything
+        # outside that window is dropped so a jump or reload cancels it.
+        try:
+            ahead = max(0, self.prefetch_ahead_var.get())
+        except tk.TclError:
+            ahead = PREFETCH_AHEAD
+        window = self.file_list[self.file_index : self.file_index + 1 + ahead]
+        wanted = set(window)
+        for f in list(self.prefetch_futures):
+            if f not in wanted:
+                self.prefetch_futures.pop(f).cancel()
+        for f in list(self.prefetched):
+            if f not in wanted:
+                del self.prefetched[f]
+        percent = self.preview_percent_var.get()
+        for f in window:
+            if f not in self.prefetched and f not in self.prefetch_futures:
+                self.prefetch_futures[f] = self.prefetch_pool.submit(
+                    prefetch_file, f, percent, self.filmstrip_var.get(), self.library
+                )
+        if self.prefetch_futures and self.prefetch_poll_id is None:
+            self.prefetch_poll_id = self.master.after(
+                PREFETCH_POLL_MS, self.poll_prefetch
+            )
+
+    def poll_prefetch(self):
+        self.prefetch_poll_id = None
+        for f, fut in list(self.prefetch_futures.items()):
+            if not fut.done():
+                continue
+            del self.prefetch_futures[f]
+            if fut.cancelled():
+                continue
+            try:
+                self.prefetched[f] = fut.result()
+            except Exception as e:
+                print(f"[PREFETCH ERROR] {f}: {e}")
+                self.prefetched[f] = {
+                    "date": None,
+                    "image": None,
+                    "ts": None,
+                    "percent": self.preview_percent_var.get(),
+                    "filmstrip": self.filmstrip_var.get(),
+                    "strip": [],
+                    "duplicate": None,
+                    "provisional": False,
+                }
+            if f == self.loading_file:
+                self.show_current_file(regen=self.loading_regen)
+        if self.prefetch_futures and self.prefetch_poll_id is None:
+            self.prefetch_poll_id = self.master.after(
+                PREFETCH_POLL_MS, self.poll_prefetch
+            )
+
+    def poll_library(self):
+        # Once the library refresh is done, redo the duplicate checks that ran
+        # before it (the lookups are cached, so only new candidates get read)
+        if self.library.ready.is_set() and not self.prefetch_futures:
+            for f, res in self.prefetched.items():
+                if res["provisional"]:
+                    res["provisional"] = False
+                    self.duplicate_rechecks[f] = self.prefetch_pool.submit(
+                        self.library.find_duplicate, f
+                    )
+            for f, fut in list(self.duplicate_rechecks.items()):
+                if not fut.done():
+                    continue
+                del self.duplicate_rechecks[f]
+                res = self.prefetched.get(f)
+                if res is None or fut.cancelled() or fut.exception():
+                    continue
+                res["duplicate"] = fut.result()
+                current = self.file_index < len(self.file_list) and (
+                    self.file_list[self.file_index] == f
+                )
+                if current and not self.loading_file:
+                    self.duplicate_of = res["duplicate"]
+                    self.update_meta_info()
+            if not self.duplicate_rechecks:
+                return
+        self.master.after(SCAN_POLL_MS, self.poll_library)
+
+    def on_preview_percent_change(self):
+        # With a filmstrip loaded the spinbox just flips between its frames
+        if self.current_strip and not self.loading_file:
+            _, img, ts = nearest_strip_frame(
+                self.current_strip, self.preview_percent_var.get()
+            )
+            p = ImageTk.PhotoImage(img)
+            self.preview_label.configure(image=p)
+            self.preview_label.image = p
+            self.timestamp_label.config(text=f"Preview at: {ts}")
+        self.schedule_meta_update()
+
+    def toggle_filmstrip(self):
+        if not self.file_list or self.file_index >= len(self.file_list):
+            return
+        self.cancel_prefetch()
+        self.show_current_file(regen=True)
+
+    def cancel_prefetch(self):
+        for fut in self.prefetch_futures.values():
+            fut.cancel()
+        self.prefetch_futures.clear()
+        self.prefetched.clear()
+        self.loading_file = None
+
+    def skip_file(self):
+        self.file_index += 1
+        self.clear_fields()
+        self.show_current_file()
+
+    def process_next(self, n=None):
+        if self.file_index >= len(self.file_list):
+            return
+        if self.loading_file:
+            return self.master.bell()
+        if n is None:
+            n = (
+                self.apply_next_var.get()
+                if not self.same_loco_var.get()
+                else len(self.file_list) - self.file_index
+            )
+        batch = files = self.file_list[self.file_index : self.file_index + max(n, 1)]
+        dry_run = self.dry_run_var.get()
+        if not dry_run:
+            if len(batch) > 1:
+                self.progress_label.config(text=f"Checking {len(batch)} files...")
+                self.master.update_idletasks()
+            dups = self.batch_duplicates(batch)
+            if dups:
+                listing = "\n".join(
+                    f"{os.path.basename(f)} = {dup}"
+                    for f, dup in list(dups.items())[:10]
+                )
+                if len(dups) > 10:
+                    listing += f"\n... and {len(dups) - 10} more"
+                answer = messagebox.askyesnocancel(
+                    "Already in the library",
+                    f"{len(dups)} of {len(batch)} files are already in the library:\n\n"
+                    f"{listing}\n\nYes: move them anyway\nNo: leave them in the inbox\n"
+                    "Cancel: don't move anything",
+                )
+                if answer is None:
+                    self.progress_label.config(text=self.progress_text())
+                    return
+                if not answer:
+                    files = [f for f in batch if f not in dups]
+            if not files:
+                self.file_index += len(batch)
+                return self.show_current_file()
+        # A dry run plans against a scratch index so nothing stays reserved
+        index = DestIndex() if dry_run else self.dest_index
+        date = (self.year_var.get(), self.month_var.get(), self.day_var.get())
+        item = (
+            self.loco_name_var.get(),
+            self.loco_number_var.get(),
+            self.location_var.get(),
+            self.short_desc_var.get(),
+            date,
+            self.date_source,
+        )
+        if len(files) > 1:
+            self.progress_label.config(text=f"Planning {len(files)} files...")
+            self.master.update_idletasks()
+        plans, failures = plan_batch([(f, *item) for f in files], index)
+        if failures:
+            messagebox.showwarning(
+                "Planning problems",
+                "\n".join(f"{os.path.basename(f)}: {why}" for f, why in failures),
+            )
+        if not dry_run:
+            data_store.remember(
+                (p["loco_name"], p["loco_number"], p["location"]) for p in plans
+            )
+            # The suggestion indexes update in place; nothing is rebuilt
+            self.name_index.add(self.loco_name_var.get(), len(plans))
+            self.number_index.add(self.loco_number_var.get(), len(plans))
+            self.location_index.add(self.location_var.get(), len(plans))
+        if dry_run:
+            out = export_plan(plans)
+            print(f"[DryRun] Plan for {len(plans)} files written to {out}")
+        else:
+            self.queue_plans(plans)
+            for plan in plans:
+                # Gone from the inbox: a new file landing under this name
+                # (the next card's DSC_0001.JPG) has to be taken again
+                self.file_mtimes.pop(plan["src"], None)
+                self.live_files.discard(plan["src"])
+            self.similar.forget(p["src"] for p in plans)
+        self.file_index += len(batch)
+        self.show_current_file()
+
+    def batch_duplicates(self, files):
+        # {file: library copy} for files about to be moved: prefetched results
+        # are reused, the rest (and provisional misses) are checked now
+        found, todo = {}, []
+        for f in files:
+            res = self.prefetched.get(f)
+            if res and not res["provisional"]:
+                if res["duplicate"]:
+                    found[f] = res["duplicate"]
+            else:
+                todo.append(f)
+        if todo:
+            with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+                for f, dup in zip(todo, pool.map(self.library.find_duplicate, todo)):
+                    if dup:
+                        found[f] = dup
+        return found
+
+    def resume_moves(self):
+        # Moves that a crash (or quitting with copies queued) left unfinished.
+        # Nothing is touched until the user says so: finishing them removes
+        # verified originals and deletes copies that were cut short.
+        unfinished = self.journal.unfinished()
+        if not unfinished:
+            return
+        if messagebox.askyesno(
+            "Unfinished moves",
+            f"{len(unfinished)} moves from the last session didn't finish. "
+            "Finish them now?\n\nOriginals already copied and verified are "
+            "removed; copies that were cut short are deleted and made again.",
+        ):
+            redo = recover_moves(self.journal)
+            self.journal.compact()
+            plans = []
+            for e in redo:
+                self.dest_index.claim(e["dest"])
+                plans.append(e.get("plan") or {"src": e["src"], "dest_file": e["dest"]})
+            self.queue_plans(plans)
+            return
+        for e in unfinished:
+            if os.path.exists(e["dest"]) and os.path.exists(e["src"]):
+                print(f"[WARNING] Left as it was ({e['state']}): {e['dest']}")
+        self.journal.log_many(
+            dict(src=e["src"], dest=e["dest"], state="abandoned") for e in unfinished
+        )
+        self.journal.compact()
+
+    def queue_plans(self, plans):
+        if not plans:
+            return
+        for plan in plans:
+            self.library.claim(plan["src"])
+            self.catalog_plans[plan["dest_file"]] = plan
+        self.transfers.submit_many([(p["src"], p["dest_file"], p) for p in plans])
+        if self.transfer_poll_id is None:
+            self.transfer_poll_id = self.master.after(
+                TRANSFER_POLL_MS, self.poll_transfers
+            )
+
+    def poll_transfers(self):
+        self.transfer_poll_id = None
+        for job in self.transfers.pop_finished():
+            plan = self.catalog_plans.pop(job.dest, None)
+            if job.status == "moved":
+                self.catalog.record(job.dest, plan, job.digest)
+                if self.proxy_var.get():
+                    self.proxies.submit(job.dest)
+            else:
+                self.transfer_errors.append(job)
+        snap = self.transfers.snapshot()
+        busy = snap["active"] or snap["queued"]
+        self.transfer_bar.config(maximum=max(snap["total"], 1), value=snap["done"])
+        text = (
+            f"Transfers: {len(snap['active'])} copying, {snap['queued']} queued | "
+            f"{snap['done'] / 1e9:.2f} of {snap['total'] / 1e9:.2f} GB | "
+            f"{snap['rate'] / 1e6:.1f} MB/s"
+        )
+        if busy and snap["eta"] is not None:
+            text += f" | ETA {int(snap['eta'] // 60)}:{int(snap['eta'] % 60):02d}"
+        for j in snap["active"]:
+            text += f"\n  {os.path.basename(j.src)}: {100 * j.done // max(j.size, 1)}%"
+        if snap["failed"]:
+            text += f" | {snap['failed']} failed"
+        self.transfer_label.config(text=text, fg="red" if snap["failed"] else "black")
+        if busy:
+            self.transfer_poll_id = self.master.after(
+                TRANSFER_POLL_MS, self.poll_transfers
+            )
+        elif self.transfer_errors:
+            errors, self.transfer_errors = self.transfer_errors, []
+            messagebox.showwarning(
+                "Transfer problems",
+                "\n".join(
+                    f"{os.path.basename(j.src)}: {j.status} - {j.message}"
+                    for j in errors
+                ),
+            )
+
+    def load_file_facts(self, f):
+        # Per-file facts for the meta panel, gathered once when the file is shown
+        ext = os.path.splitext(f)[1].lower()
+        st = os.stat(f)
+        return {
+            "path": f,
+            "ext": ext,
+            "is_photo": ext in IMAGE_EXTENSIONS,
+            "orientation": (
+                probe_video_orientation(f) if ext in VIDEO_EXTENSIONS else None
+            ),
+            "ctime": datetime.fromtimestamp(st.st_ctime).strftime("%Y-%m-%d %H:%M:%S"),
+            "mtime": datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    @traced("GalaSorter.current_destination")
+    def current_destination(self):
+        f = self.file_list[self.file_index]
+        if not self.file_facts or self.file_facts["path"] != f:
+            self.file_facts = self.load_file_facts(f)
+        facts = self.file_facts
+        dest_dir = build_dest_path(
+            self.loco_name_var.get(),
+            self.loco_number_var.get(),
+            self.location_var.get(),
+            self.year_var.get(),
+            self.month_var.get(),
+            self.day_var.get(),
+            facts["orientation"],
+            facts["is_photo"],
+        )
+        dest_file, conflict = self.dest_index.pick(
+            dest_dir,
+            self.loco_number_var.get(),
+            self.year_var.get(),
+            self.location_var.get(),
+            self.short_desc_var.get(),
+            facts["ext"],
+            reserve=False,
+        )
+        return dest_dir, dest_file, self.dest_index.exists(dest_dir), conflict
+
+    @traced("GalaSorter.update_meta_info")
+    def update_meta_info(self):
+        if self.meta_after_id is not None:
+            self.master.after_cancel(self.meta_after_id)
+            self.meta_after_id = None
+        if not self.file_list or self.file_index >= len(self.file_list):
+            return
+        if self.loading_file:
+            return
+
+        f = self.file_list[self.file_index]
+        dest_dir, dest_file, dir_exists, conflict = self.current_destination()
+        facts = self.file_facts
+        date_source = self.date_source
+
+        self.meta_text.config(state="normal")
+        self.meta_text.delete("1.0", "end")
+        self.meta_text.insert("end", f"File Path: {f}\n")
+        self.meta_text.insert("end", f"File Name: {os.path.basename(f)}\n")
+        self.meta_text.insert("end", f"Create Date: {facts['ctime']}\n")
+        self.meta_text.insert("end", f"Modified Date: {facts['mtime']}\n")
+
+        if date_source == "Metadata":
+            self.meta_text.insert("end", f"Date Source: {date_source}\n", "meta_source")
+        elif date_source == "Modified Date":
+            self.meta_text.insert("end", f"Date Source: {date_source}\n", "modified_source")
+        else:
+            self.meta_text.insert("end", f"Date Source: {date_source}\n", "manual_source")
+
+        if dir_exists:
+            self.meta_text.insert("end", f"Destination Folder (exists): {dest_dir}\n", "folder_exists")
+        else:
+            self.meta_text.insert("end", f"Destination Folder (will be created): {dest_dir}\n", "folder_missing")
+
+        if conflict:
+            self.meta_text.insert("end", f"Destination File (conflict, renamed): {dest_file}", "file_conflict")
+        else:
+            self.meta_text.insert("end", f"Destination File (no conflicts): {dest_file}", "file_ok")
+
+        if self.duplicate_of:
+            self.meta_text.insert("end", f"\nDuplicate of: {self.duplicate_of}", "duplicate")
+        hung = hung_files.get(os.path.abspath(f))
+        if hung:
+            self.meta_text.insert("end", f"\nHung: {hung}", "duplicate")
+
+        self.meta_text.config(state="disabled")
+
+
+    def copy_dest_path(self):
+        if not self.file_list or self.file_index >= len(self.file_list):
+            return
+        if self.loading_file:
+            return
+        dest, _, _, _ = self.current_destination()
+        self.master.clipboard_clear()
+        self.master.clipboard_append(dest)
+
+    def copy_dest_file(self):
+        if not self.file_list or self.file_index >= len(self.file_list):
+            return
+        if self.loading_file:
+            return
+        _, dest_file, _, _ = self.current_destination()
+        self.master.clipboard_clear()
+        self.master.clipboard_append(dest_file)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gala Mode Video Sorter")
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="sort the inbox without the GUI using a CSV or JSON manifest",
+    )
+    parser.add_argument("--inbox", default=DEFAULT_INBOX, help="inbox folder")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="plan the moves but don't move anything"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=PROBE_WORKERS, help="parallel metadata probes"
+    )
+    parser.add_argument(
+        "--skip-duplicates",
+        action="store_true",
+        help="leave files already in the library in the inbox",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="only take inbox files matching this name pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        metavar="GLOB",
+        help="skip inbox files/folders matching this name pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--proxies",
+        action="store_true",
+        default=PROXY_ENABLED,
+        help="queue a low-res proxy of every sorted clip (resumes unfinished ones too)",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="update the catalog of the sorted library (back-fills on first run)",
+    )
+    parser.add_argument(
+        "--find",
+        nargs="+",
+        action="extend",
+        metavar="FIELD=VALUE",
+        help="list catalogued files, e.g. loco_number=6880 year=2025 (* wildcards)",
+    )
+    parser.add_argument(
+        "--count-by",
+        metavar="FIELD",
+        help="count catalogued files per value of FIELD (narrow it with --find)",
+    )
+    parser.add_argument(
+        "--groups",
+        action="store_true",
+        help="list bursts of similar shots in the inbox (Apply-to-N groups) and exit",
+    )
+    parser.add_argument(
+        "--plan-out",
+        metavar="FILE",
+        help="where --dry-run writes the plan (.csv or .json, '-' for stdout)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="time the hot paths and write a trace on exit (.json Chrome trace or .jsonl)",
+    )
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracer.enabled = True
+    try:
+        return run(args)
+    finally:
+        if args.trace:
+            n = tracer.export(args.trace)
+            print(f"[INFO] {n} trace events written to {args.trace}")
+
+
+def run(args):
+    init_environment()
+    if args.catalog or args.find or args.count_by:
+        return run_catalog(args.find, args.count_by)
+    if args.groups:
+        return run_groups(
+            args.inbox, workers=args.workers, include=args.include, exclude=args.exclude
+        )
+    if args.batch:
+        return run_batch(
+            args.inbox,
+            args.batch,
+            args.dry_run,
+            args.workers,
+            args.skip_duplicates,
+            args.include,
+            args.exclude,
+            args.plan_out,
+            args.proxies,
+        )
+    _import_tk()
+    root = tk.Tk()
+    GalaSorter(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())